@@ -0,0 +1,200 @@
+# analytics.py
+# Колоночная таблица подтвержденных транзакций для аналитических запросов.
+# Таблица дополняется новыми блоками, запросы считаются векторно по массивам NumPy.
+from typing import List, Dict, Iterable, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+COLUMNS = {
+    'height': 'int64',
+    'sender': 'int32',
+    'receiver': 'int32',
+    'amount': 'float64',
+    'fee': 'float64',
+    'timestamp': 'float64',
+    'miner': 'int32',
+}
+AGGREGATES = ('sum', 'count', 'mean', 'min', 'max')
+
+
+class TransactionTable:
+    def __init__(self, capacity: int = 1024):
+        if np is None:
+            raise ImportError("Для аналитики нужен numpy")
+        self.size = 0
+        self.next_height = 0
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        # Отправитель "0" - награда майнеру, такие строки не считаются переводами
+        self.coinbase_id = self.wallet_id("0")
+
+    def __len__(self) -> int:
+        return self.size
+
+    def column(self, name: str):
+        return self._columns[name][:self.size]
+
+    def wallet_id(self, name: Optional[str]) -> int:
+        if name is None:
+            return -1
+        wallet_id = self.ids.get(name)
+        if wallet_id is None:
+            wallet_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return wallet_id
+
+    def _reserve(self, extra: int):
+        needed = self.size + extra
+        capacity = len(self._columns['height'])
+        if needed <= capacity:
+            return
+        # Удвоение емкости - добавление блоков остается амортизированно линейным
+        while capacity < needed:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self._columns[name] = grown
+
+    def append_columns(self, **values):
+        count = len(values['height'])
+        self._reserve(count)
+        for name in COLUMNS:
+            self._columns[name][self.size:self.size + count] = values[name]
+        self.size += count
+
+    def append_block(self, block):
+        transactions = block.transactions
+        wallet_id = self.wallet_id
+        self.append_columns(
+            height=[block.index] * len(transactions),
+            sender=[wallet_id(tx.sender) for tx in transactions],
+            receiver=[wallet_id(tx.receiver) for tx in transactions],
+            amount=[tx.amount for tx in transactions],
+            fee=[tx.fee for tx in transactions],
+            timestamp=[tx.timestamp for tx in transactions],
+            miner=[wallet_id(block.miner)] * len(transactions)
+        )
+        self.next_height = block.index + 1
+
+    def extend(self, blocks: Iterable) -> int:
+        count = 0
+        for block in blocks:
+            self.append_block(block)
+            count += 1
+        return count
+
+    def update(self, blockchain) -> int:
+        # Добавляются только блоки, появившиеся после прошлого обновления
+        return self.extend(blockchain.iter_blocks(self.next_height))
+
+    def transfers_mask(self):
+        return self.column('sender') != self.coinbase_id
+
+    def _group_index(self, keys) -> Tuple:
+        # Целочисленные ключи из узкого диапазона (id кошельков, высоты, часы)
+        # группируются через bincount без сортировки; остальные - через np.unique
+        if len(keys) and keys.dtype.kind in 'iu':
+            low = int(keys.min())
+            span = int(keys.max()) - low + 1
+            if span <= 2 * len(keys) + 1024:
+                offsets = keys - low
+                present = np.flatnonzero(np.bincount(offsets, minlength=span))
+                lookup = np.empty(span, dtype=np.int64)
+                lookup[present] = np.arange(len(present))
+                return present + low, lookup[offsets]
+        return np.unique(keys, return_inverse=True)
+
+    def group_by(self, key: str, value: str = None, agg: str = 'sum', mask=None) -> Tuple:
+        if agg not in AGGREGATES:
+            raise ValueError(f"Неизвестная агрегация: {agg}")
+        keys = self.column(key)
+        values = self.column(value) if value is not None else None
+        if mask is not None:
+            keys = keys[mask]
+            values = values[mask] if values is not None else None
+
+        groups, inverse = self._group_index(keys)
+        counts = np.bincount(inverse, minlength=len(groups))
+        if agg == 'count':
+            return groups, counts
+        if agg in ('sum', 'mean'):
+            sums = np.bincount(inverse, weights=values, minlength=len(groups))
+            return groups, sums if agg == 'sum' else sums / counts
+
+        if agg == 'min':
+            result = np.full(len(groups), np.inf)
+            np.minimum.at(result, inverse, values)
+        else:
+            result = np.full(len(groups), -np.inf)
+            np.maximum.at(result, inverse, values)
+        return groups, result
+
+    def fee_percentiles_per_block(self, percentiles: Sequence[float] = (10, 50, 90)) -> Tuple:
+        mask = self.transfers_mask()
+        heights = self.column('height')[mask]
+        fees = self.column('fee')[mask]
+        if not len(heights):
+            return heights, np.empty((0, len(percentiles)))
+
+        # Сортировка по (блок, комиссия), затем линейная интерполяция внутри каждой группы.
+        # Две устойчивые сортировки быстрее np.lexsort на миллионах строк
+        order = np.argsort(fees)
+        order = order[np.argsort(heights[order], kind='stable')]
+        heights = heights[order]
+        fees = fees[order]
+        groups, starts, counts = np.unique(heights, return_index=True, return_counts=True)
+
+        result = np.empty((len(groups), len(percentiles)))
+        for i, percentile in enumerate(percentiles):
+            position = (counts - 1) * (percentile / 100.0)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.minimum(lower + 1, counts - 1)
+            fraction = position - lower
+            result[:, i] = fees[starts + lower] * (1 - fraction) + fees[starts + upper] * fraction
+        return groups, result
+
+    def top_senders(self, n: int = 10, by: str = 'amount') -> List[Tuple[str, float]]:
+        mask = self.transfers_mask()
+        senders = self.column('sender')[mask]
+        weights = None if by == 'count' else self.column(by)[mask]
+        totals = np.bincount(senders, weights=weights, minlength=len(self.names))
+        n = min(n, len(totals))
+        if n == 0:
+            return []
+        top = np.argpartition(-totals, n - 1)[:n]
+        top = top[np.argsort(-totals[top], kind='stable')]
+        return [(self.names[i], float(totals[i])) for i in top if totals[i] > 0]
+
+    def miner_revenue_share(self) -> Dict[str, float]:
+        # Доход майнера: комиссии в его блоках и полученные им награды
+        miners = self.column('miner')
+        mined = miners >= 0
+        transfers = mined & self.transfers_mask()
+        revenue = np.bincount(miners[transfers], weights=self.column('fee')[transfers],
+                              minlength=len(self.names))
+
+        is_miner = np.zeros(len(self.names), dtype=bool)
+        is_miner[miners[mined]] = True
+        coinbase = ~self.transfers_mask()
+        receivers = self.column('receiver')[coinbase]
+        rewarded = is_miner[receivers]
+        revenue += np.bincount(receivers[rewarded], weights=self.column('amount')[coinbase][rewarded],
+                               minlength=len(self.names))
+
+        total = revenue.sum()
+        if total == 0:
+            return {}
+        return {self.names[i]: float(revenue[i] / total) for i in np.flatnonzero(is_miner)}
+
+    def volume_per_hour(self) -> Tuple:
+        mask = self.transfers_mask()
+        hours = np.floor(self.column('timestamp')[mask] / 3600.0).astype(np.int64)
+        groups, inverse = self._group_index(hours)
+        volume = np.bincount(inverse, weights=self.column('amount')[mask], minlength=len(groups))
+        counts = np.bincount(inverse, minlength=len(groups))
+        return groups * 3600, volume, counts
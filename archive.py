@@ -0,0 +1,303 @@
+# archive.py
+# Архив диапазона блоков: блоки режутся на чанки, каждый чанк хранится по колонкам
+# со своим словарем имен кошельков и сжимается отдельно. В конце файла лежит индекс чанков,
+# поэтому чтение блока N распаковывает только его чанк.
+import bisect
+import json
+import lzma
+import re
+import struct
+import zlib
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+
+from blockchain import Block
+
+ARCHIVE_MAGIC = b"BCARCH1\n"
+ARCHIVE_FORMAT = 1
+CODECS = {
+    'zlib': (lambda data, level: zlib.compress(data, 9 if level is None else level), zlib.decompress),
+    'lzma': (lambda data, level: lzma.compress(data, preset=6 if level is None else level), lzma.decompress),
+}
+
+_HEX_DIGEST = re.compile(r"[0-9a-f]{64}\Z")
+_SIGNED_DIGEST = re.compile(r"signed_[0-9a-f]{64}\Z")
+
+
+def _pack_digests(values: List[str], prefix: str, pattern) -> bytes:
+    # Хеши в hex занимают вдвое больше места, чем сами байты, и почти не сжимаются
+    if not all(isinstance(value, str) and pattern.match(value) for value in values):
+        return None
+    return b"".join(bytes.fromhex(value[len(prefix):]) for value in values)
+
+
+def _unpack_digests(data: bytes, prefix: str) -> List[str]:
+    return [prefix + data[i:i + 32].hex() for i in range(0, len(data), 32)]
+
+
+def encode_chunk(blocks: List[Block]) -> bytes:
+    names: Dict[str, int] = {}
+
+    def name_id(name: str) -> int:
+        if name is None:
+            return -1
+        wallet_id = names.get(name)
+        if wallet_id is None:
+            wallet_id = names[name] = len(names)
+        return wallet_id
+
+    header: Dict[str, Any] = {
+        'first_height': blocks[0].index,
+        # previous_hash остальных блоков совпадает с хешем предыдущего блока в чанке,
+        # расходящиеся связи хранятся явно в links, чтобы архив не исправлял цепь
+        'previous_hash': blocks[0].previous_hash,
+        'links': {},
+        'timestamp': [], 'nonce': [], 'difficulty': [], 'miner': [],
+        'mining_duration': [], 'tx_count': [],
+        'tx_id': [], 'sender': [], 'receiver': [], 'amount': [], 'fee': [], 'tx_timestamp': []
+    }
+    hashes = []
+    signatures = []
+
+    for i, block in enumerate(blocks):
+        if i > 0 and block.previous_hash != blocks[i - 1].hash:
+            header['links'][str(i)] = block.previous_hash
+        header['timestamp'].append(block.timestamp)
+        header['nonce'].append(block.nonce)
+        header['difficulty'].append(block.difficulty)
+        header['miner'].append(name_id(block.miner))
+        header['mining_duration'].append(block.mining_duration)
+        hashes.append(block.hash)
+
+        transactions = block.transactions
+        header['tx_count'].append(len(transactions))
+        for tx in transactions:
+            header['tx_id'].append(tx.transaction_id)
+            header['sender'].append(name_id(tx.sender))
+            header['receiver'].append(name_id(tx.receiver))
+            header['amount'].append(tx.amount)
+            header['fee'].append(tx.fee)
+            header['tx_timestamp'].append(tx.timestamp)
+            signatures.append(tx.signature)
+
+    packed_hashes = _pack_digests(hashes, "", _HEX_DIGEST)
+    if packed_hashes is None:
+        header['hash'] = hashes
+        packed_hashes = b""
+
+    packed_signatures = _pack_digests(signatures, "signed_", _SIGNED_DIGEST)
+    if packed_signatures is None:
+        header['signature'] = signatures
+        packed_signatures = b""
+
+    header['names'] = list(names)
+    header_bytes = json.dumps(header, separators=(',', ':')).encode()
+    return struct.pack("<III", len(header_bytes), len(packed_hashes), len(packed_signatures)) + \
+        header_bytes + packed_hashes + packed_signatures
+
+
+def decode_chunk(data: bytes) -> List[Block]:
+    header_size, hashes_size, signatures_size = struct.unpack_from("<III", data)
+    offset = struct.calcsize("<III")
+    header = json.loads(data[offset:offset + header_size])
+    offset += header_size
+    if 'hash' in header:
+        hashes = header['hash']
+    else:
+        hashes = _unpack_digests(data[offset:offset + hashes_size], "")
+    offset += hashes_size
+    if 'signature' in header:
+        signatures = header['signature']
+    else:
+        signatures = _unpack_digests(data[offset:offset + signatures_size], "signed_")
+
+    names = header['names']
+    tx_ids = header['tx_id']
+    senders = header['sender']
+    receivers = header['receiver']
+    amounts = header['amount']
+    fees = header['fee']
+    tx_timestamps = header['tx_timestamp']
+
+    blocks = []
+    links = header.get('links', {})
+    previous_hash = header['previous_hash']
+    position = 0
+    for i, tx_count in enumerate(header['tx_count']):
+        transactions = []
+        for j in range(position, position + tx_count):
+            transactions.append({
+                'transaction_id': tx_ids[j],
+                'sender': names[senders[j]],
+                'receiver': names[receivers[j]],
+                'amount': amounts[j],
+                'fee': fees[j],
+                'timestamp': tx_timestamps[j],
+                'signature': signatures[j]
+            })
+        position += tx_count
+
+        miner = header['miner'][i]
+        previous_hash = links.get(str(i), previous_hash)
+        blocks.append(Block.from_dict({
+            'index': header['first_height'] + i,
+            'transactions': transactions,
+            'previous_hash': previous_hash,
+            'timestamp': header['timestamp'][i],
+            'nonce': header['nonce'][i],
+            'difficulty': header['difficulty'][i],
+            'miner': names[miner] if miner >= 0 else None,
+            'hash': hashes[i],
+            'mining_duration': header['mining_duration'][i]
+        }))
+        previous_hash = hashes[i]
+
+    return blocks
+
+
+class ArchiveWriter:
+    def __init__(self, path: str, chunk_size: int = 256, codec: str = 'zlib', level: int = None):
+        if codec not in CODECS:
+            raise ValueError(f"Неизвестный кодек архива: {codec}")
+        if chunk_size < 1:
+            raise ValueError("Размер чанка должен быть положительным")
+        self.path = path
+        self.chunk_size = chunk_size
+        self.codec = codec
+        self.level = level
+        # [первая высота, число блоков, смещение, длина] для каждого чанка
+        self.chunks: List[List[int]] = []
+        self.block_count = 0
+        self._pending: List[Block] = []
+        self._next_height = None
+        self._file = open(path, 'wb')
+        self._file.write(ARCHIVE_MAGIC)
+
+    def add(self, block: Block):
+        if self._next_height is not None and block.index != self._next_height:
+            raise ValueError(f"Архив хранит непрерывный диапазон: ожидался блок #{self._next_height}")
+        self._next_height = block.index + 1
+        self._pending.append(block)
+        self.block_count += 1
+        if len(self._pending) >= self.chunk_size:
+            self._flush_chunk()
+
+    def add_many(self, blocks: Iterable[Block]) -> int:
+        count = 0
+        for block in blocks:
+            self.add(block)
+            count += 1
+        return count
+
+    def _flush_chunk(self):
+        if not self._pending:
+            return
+        compress = CODECS[self.codec][0]
+        payload = compress(encode_chunk(self._pending), self.level)
+        offset = self._file.tell()
+        self._file.write(payload)
+        self.chunks.append([self._pending[0].index, len(self._pending), offset, len(payload)])
+        self._pending = []
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._flush_chunk()
+        index = zlib.compress(json.dumps({
+            'format': ARCHIVE_FORMAT,
+            'codec': self.codec,
+            'chunks': self.chunks
+        }).encode())
+        index_offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(struct.pack("<Q", index_offset))
+        self._file.write(ARCHIVE_MAGIC)
+        self._file.close()
+
+    def __enter__(self) -> 'ArchiveWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+class ArchiveReader:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        if self._file.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            self._file.close()
+            raise ValueError(f"Файл не является архивом блоков: {path}")
+
+        footer_size = 8 + len(ARCHIVE_MAGIC)
+        self._file.seek(-footer_size, 2)
+        footer = self._file.read(footer_size)
+        if footer[8:] != ARCHIVE_MAGIC:
+            self._file.close()
+            raise ValueError(f"Архив поврежден или не закрыт: {path}")
+        index_offset = struct.unpack("<Q", footer[:8])[0]
+        index_end = self._file.tell() - footer_size
+        self._file.seek(index_offset)
+        index = json.loads(zlib.decompress(self._file.read(index_end - index_offset)))
+
+        if index['format'] > ARCHIVE_FORMAT:
+            self._file.close()
+            raise ValueError(f"Неподдерживаемый формат архива: {index['format']}")
+        self.codec = index['codec']
+        self.chunks: List[List[int]] = index['chunks']
+        self._first_heights = [chunk[0] for chunk in self.chunks]
+        self._cached_chunk = None
+        self._cached_blocks: List[Block] = []
+        self.chunks_decoded = 0
+
+    def __len__(self) -> int:
+        return sum(chunk[1] for chunk in self.chunks)
+
+    @property
+    def height_range(self) -> Tuple[int, int]:
+        if not self.chunks:
+            return 0, 0
+        last = self.chunks[-1]
+        return self.chunks[0][0], last[0] + last[1]
+
+    def _load_chunk(self, number: int) -> List[Block]:
+        if self._cached_chunk != number:
+            _, _, offset, length = self.chunks[number]
+            self._file.seek(offset)
+            decompress = CODECS[self.codec][1]
+            self._cached_blocks = decode_chunk(decompress(self._file.read(length)))
+            self._cached_chunk = number
+            self.chunks_decoded += 1
+        return self._cached_blocks
+
+    def get_block(self, height: int) -> Block:
+        number = bisect.bisect_right(self._first_heights, height) - 1
+        if number < 0 or height >= self.chunks[number][0] + self.chunks[number][1]:
+            raise KeyError(f"Блок #{height} отсутствует в архиве")
+        return self._load_chunk(number)[height - self.chunks[number][0]]
+
+    def iter_blocks(self, start: int = None, stop: int = None) -> Iterator[Block]:
+        first, end = self.height_range
+        start = first if start is None else max(start, first)
+        stop = end if stop is None else min(stop, end)
+        height = start
+        while height < stop:
+            number = bisect.bisect_right(self._first_heights, height) - 1
+            first_height = self.chunks[number][0]
+            blocks = self._load_chunk(number)
+            for block in blocks[height - first_height:stop - first_height]:
+                yield block
+            height = first_height + len(blocks)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> 'ArchiveReader':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+def write_archive(blocks: Iterable[Block], path: str, **kwargs) -> int:
+    with ArchiveWriter(path, **kwargs) as writer:
+        return writer.add_many(blocks)
@@ -0,0 +1,322 @@
+# benchmark.py
+import random
+import sys
+import time
+from typing import List
+
+from blockchain import Block, Transaction, CounterIdFactory
+from hashing import NonceSearch
+from mempool import Mempool
+
+
+def make_random_transactions(count: int, seed: int = 42) -> List[Transaction]:
+    rng = random.Random(seed)
+    ids = CounterIdFactory("bench")
+    transactions = []
+    for i in range(count):
+        # Разная длина получателя дает транзакции разного размера
+        receiver = f"wallet_{rng.randrange(10_000)}_" + "m" * rng.randrange(0, 400)
+        tx = Transaction(f"wallet_{rng.randrange(10_000)}", receiver, round(rng.uniform(0.1, 50.0), 4),
+                         timestamp=1_700_000_000.0 + i, transaction_id=ids())
+        tx.fee = round(rng.uniform(0.0001, 1.0), 6)
+        tx.sign_transaction()
+        transactions.append(tx)
+    return transactions
+
+
+def benchmark_selection(pending: int = 100_000, max_block_bytes: int = 1_000_000, blocks: int = 5):
+    print(f"=== БЕНЧМАРК: Отбор транзакций ({pending} в пуле, блок {max_block_bytes} байт) ===")
+
+    transactions = make_random_transactions(pending)
+
+    # Прежний подход: сортировка по абсолютной комиссии при каждом блоке
+    remaining = list(transactions)
+    fee_sorted_total = 0.0
+    start = time.perf_counter()
+    for _ in range(blocks):
+        budget = max_block_bytes
+        chosen = []
+        for tx in sorted(remaining, key=lambda tx: tx.fee, reverse=True):
+            size = tx.get_size()
+            if size <= budget:
+                chosen.append(tx)
+                budget -= size
+        chosen_ids = {tx.transaction_id for tx in chosen}
+        remaining = [tx for tx in remaining if tx.transaction_id not in chosen_ids]
+        fee_sorted_total += sum(tx.fee for tx in chosen)
+    fee_sorted_time = time.perf_counter() - start
+
+    mempool = Mempool()
+    start = time.perf_counter()
+    for tx in transactions:
+        mempool.add(tx)
+    admission_time = time.perf_counter() - start
+
+    feerate_total = 0.0
+    start = time.perf_counter()
+    for _ in range(blocks):
+        chosen = mempool.select(max_bytes=max_block_bytes)
+        for tx in chosen:
+            mempool.remove(tx)
+        feerate_total += sum(tx.fee for tx in chosen)
+    feerate_time = time.perf_counter() - start
+
+    print(f"  По комиссии:        {fee_sorted_total:10.4f} BTC за {blocks} блоков, {fee_sorted_time:.3f} сек")
+    print(f"  По комиссии за байт: {feerate_total:10.4f} BTC за {blocks} блоков, {feerate_time:.3f} сек")
+    print(f"  Прирост комиссий: {(feerate_total / fee_sorted_total - 1) * 100:.1f}%")
+    print(f"  Добавление в пул: {admission_time:.3f} сек ({pending / admission_time:.0f} tx/сек)")
+    print()
+
+
+def benchmark_eviction(pending: int = 100_000, capacity: int = 20_000):
+    print(f"=== БЕНЧМАРК: Добавление с вытеснением ({pending} транзакций, лимит {capacity}) ===")
+
+    transactions = make_random_transactions(pending, seed=7)
+    mempool = Mempool(max_transactions=capacity, min_feerate=0.000001)
+
+    start = time.perf_counter()
+    for tx in transactions:
+        mempool.admit(tx)
+    elapsed = time.perf_counter() - start
+
+    stats = mempool.get_stats()
+    print(f"  Время: {elapsed:.3f} сек ({pending / elapsed:.0f} tx/сек)")
+    print(f"  В пуле: {stats['transactions']}, вытеснено: {stats['evicted']}, отклонено: {stats['rejected']}")
+    print(f"  Минимальная комиссия за байт: {stats['min_feerate']:.8f}")
+    print()
+
+
+def benchmark_hashing(transactions: int = 10, nonces: int = 50_000):
+    print(f"=== БЕНЧМАРК: Перебор nonce ({transactions} транзакций в блоке, {nonces} nonce) ===")
+
+    block = Block(1, make_random_transactions(transactions), "0" * 64, timestamp=1_700_000_000.0)
+    block.difficulty = 64
+
+    start = time.perf_counter()
+    for nonce in range(nonces):
+        block.nonce = nonce
+        block.calculate_hash()
+    python_rate = nonces / (time.perf_counter() - start)
+
+    search = NonceSearch(block)
+    start = time.perf_counter()
+    search.search(0, nonces, 64)
+    batch_rate = nonces / (time.perf_counter() - start)
+
+    print(f"  python: {python_rate:12.0f} H/s")
+    print(f"  batch:  {batch_rate:12.0f} H/s (x{batch_rate / python_rate:.1f})")
+    print()
+
+
+def benchmark_startup(blocks: int = 200, wallets: int = 1000, runs: int = 5):
+    print(f"=== БЕНЧМАРК: Запуск короткого процесса ({blocks} блоков, {wallets} кошельков) ===")
+    import os
+    import subprocess
+    import tempfile
+    from blockchain import Blockchain
+
+    blockchain = Blockchain(difficulty=0)
+    for i in range(wallets):
+        blockchain.wallets[f"wallet_{i}"] = 100.0
+    for tx in make_random_transactions(blocks, seed=3):
+        blockchain.pending_transactions.add(tx)
+        blockchain.mine_pending_transactions("Miner1", max_transactions=1)
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        snapshot_path = os.path.join(temp_dir, "chain.snapshot")
+        blockchain.save_snapshot(snapshot_path)
+
+        commands = {
+            'readonly': [sys.executable, "readonly.py", snapshot_path, "balance", "wallet_7"],
+            'blockchain': [sys.executable, "-c", "from blockchain import Blockchain; Blockchain()"],
+        }
+        for name, command in commands.items():
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                subprocess.run(command, cwd=directory, capture_output=True, check=True)
+                timings.append(time.perf_counter() - start)
+            print(f"  {name}: {min(timings) * 1000:.1f} мс (лучший из {runs})")
+    print()
+
+
+def benchmark_execution(wallets: int = 100_000, transactions: int = 20_000):
+    print(f"=== БЕНЧМАРК: Применение блока ({transactions} транзакций, {wallets} кошельков) ===")
+    from concurrent.futures import ThreadPoolExecutor
+    from execution import BlockExecutor, apply_block_serial
+    from wallets import WalletRegistry
+
+    rng = random.Random(11)
+    names = [f"wallet_{i}" for i in range(wallets)]
+    block_transactions = []
+    for i in range(transactions):
+        tx = Transaction(rng.choice(names), rng.choice(names), 1.0, timestamp=1_700_000_000.0, transaction_id=f"b-{i}")
+        tx.fee = 0.01
+        block_transactions.append(tx)
+    block = Block(1, block_transactions, "0" * 64, timestamp=1_700_000_000.0)
+    block.miner = "Miner1"
+
+    results = {}
+    for mode in ('serial', 'grouped'):
+        registry = WalletRegistry(num_shards=4)
+        registry.register_many(names, 100.0)
+        start = time.perf_counter()
+        if mode == 'serial':
+            apply_block_serial(registry, block, 50.0)
+        else:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                executor = BlockExecutor(executor=pool)
+                executor.execute(registry, block, 50.0)
+        results[mode] = (time.perf_counter() - start, dict(registry))
+        print(f"  {mode}: {results[mode][0]:.3f} сек")
+
+    print(f"  Результаты совпадают: {results['serial'][1] == results['grouped'][1]}, групп: {executor.last_group_count}")
+    print()
+
+
+def benchmark_archive(blocks: int = 200, transactions_per_block: int = 100, lookups: int = 50):
+    print(f"=== БЕНЧМАРК: Архив блоков ({blocks} блоков по {transactions_per_block} транзакций) ===")
+    import io
+    import json
+    import os
+    import tempfile
+    import zlib
+    from archive import ArchiveReader, write_archive
+    from blockchain import write_ndjson_blocks, read_ndjson_blocks
+
+    rng = random.Random(21)
+    names = [f"wallet_{i}" for i in range(2_000)]
+    ids = CounterIdFactory("arch")
+    chain = []
+    previous_hash = "0" * 64
+    for height in range(blocks):
+        block_transactions = []
+        for i in range(transactions_per_block):
+            tx = Transaction(rng.choice(names), rng.choice(names), round(rng.uniform(0.1, 50.0), 4),
+                             timestamp=1_700_000_000.0 + height * 600 + i, transaction_id=ids())
+            tx.fee = round(rng.uniform(0.0001, 1.0), 6)
+            tx.sign_transaction()
+            block_transactions.append(tx)
+        block = Block(height, block_transactions, previous_hash, timestamp=1_700_000_000.0 + height * 600)
+        block.miner = f"Miner{rng.randrange(5)}"
+        chain.append(block)
+        previous_hash = block.hash
+    total_transactions = blocks * transactions_per_block
+
+    buffer = io.StringIO()
+    write_ndjson_blocks(chain, buffer)
+    ndjson = buffer.getvalue().encode()
+    ndjson_zlib = zlib.compress(ndjson, 9)
+
+    start = time.perf_counter()
+    decoded = list(read_ndjson_blocks(io.StringIO(ndjson.decode())))
+    ndjson_time = time.perf_counter() - start
+    # Без индекса блок N из NDJSON достается только чтением файла с начала
+    start = time.perf_counter()
+    for _ in range(lookups):
+        height = rng.randrange(blocks)
+        for line in io.StringIO(ndjson.decode()):
+            if json.loads(line)['index'] == height:
+                break
+    ndjson_lookup = (time.perf_counter() - start) / lookups
+
+    print(f"  {'формат':<14}{'байт/tx':>10}{'чтение, tx/сек':>18}{'блок N, мс':>14}")
+    print(f"  {'ndjson':<14}{len(ndjson) / total_transactions:>10.1f}"
+          f"{len(decoded) * transactions_per_block / ndjson_time:>18.0f}{ndjson_lookup * 1000:>14.2f}")
+    print(f"  {'ndjson+zlib':<14}{len(ndjson_zlib) / total_transactions:>10.1f}{'-':>18}{'-':>14}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for codec in ('zlib', 'lzma'):
+            path = os.path.join(directory, f"chain.{codec}")
+            write_archive(chain, path, chunk_size=16, codec=codec)
+            size = os.path.getsize(path)
+
+            with ArchiveReader(path) as reader:
+                start = time.perf_counter()
+                count = sum(1 for _ in reader.iter_blocks())
+                read_time = time.perf_counter() - start
+
+            # Новый читатель на каждый запрос - без кеша последнего чанка
+            start = time.perf_counter()
+            for _ in range(lookups):
+                with ArchiveReader(path) as reader:
+                    reader.get_block(rng.randrange(blocks))
+            lookup_time = (time.perf_counter() - start) / lookups
+
+            print(f"  {'архив ' + codec:<14}{size / total_transactions:>10.1f}"
+                  f"{count * transactions_per_block / read_time:>18.0f}{lookup_time * 1000:>14.2f}")
+    print()
+
+
+def benchmark_analytics(rows: int = 1_000_000, wallets: int = 50_000, per_block: int = 2_000):
+    print(f"=== БЕНЧМАРК: Аналитика по колоночной таблице ({rows} транзакций) ===")
+    import numpy as np
+    from analytics import TransactionTable
+
+    rng = np.random.default_rng(5)
+    table = TransactionTable()
+    for i in range(wallets):
+        table.wallet_id(f"wallet_{i}")
+    miners = [table.wallet_id(f"Miner{i}") for i in range(10)]
+
+    heights = np.arange(rows) // per_block
+    start = time.perf_counter()
+    table.append_columns(
+        height=heights,
+        sender=rng.integers(1, wallets, rows),
+        receiver=rng.integers(1, wallets, rows),
+        amount=rng.uniform(0.1, 50.0, rows),
+        fee=rng.uniform(0.0001, 1.0, rows),
+        timestamp=1_700_000_000.0 + heights * 600.0 + rng.uniform(0, 600, rows),
+        miner=np.asarray(miners)[heights % len(miners)]
+    )
+    print(f"  Загрузка столбцов: {(time.perf_counter() - start) * 1000:.1f} мс")
+
+    queries = {
+        'fee_percentiles_per_block': lambda: table.fee_percentiles_per_block(),
+        'top_senders': lambda: table.top_senders(10),
+        'miner_revenue_share': lambda: table.miner_revenue_share(),
+        'volume_per_hour': lambda: table.volume_per_hour(),
+        'group_by(receiver, max fee)': lambda: table.group_by('receiver', 'fee', agg='max'),
+    }
+    for name, query in queries.items():
+        start = time.perf_counter()
+        query()
+        print(f"  {name:<28} {(time.perf_counter() - start) * 1000:8.1f} мс")
+
+    # Для сравнения: тот же top_senders циклом по строкам
+    senders = table.column('sender').tolist()
+    amounts = table.column('amount').tolist()
+    start = time.perf_counter()
+    totals: dict = {}
+    for sender, amount in zip(senders, amounts):
+        totals[sender] = totals.get(sender, 0.0) + amount
+    sorted(totals.items(), key=lambda item: item[1], reverse=True)[:10]
+    print(f"  {'top_senders циклом':<28} {(time.perf_counter() - start) * 1000:8.1f} мс")
+    print()
+
+
+BENCHMARKS = {
+    'selection': benchmark_selection,
+    'eviction': benchmark_eviction,
+    'hashing': benchmark_hashing,
+    'startup': benchmark_startup,
+    'execution': benchmark_execution,
+    'archive': benchmark_archive,
+    'analytics': benchmark_analytics,
+}
+
+
+def run_all_benchmarks(names: List[str] = None):
+    """Запуск бенчмарков"""
+    print("⏱️ ЗАПУСК БЕНЧМАРКОВ ⏱️\n")
+
+    for name in names or BENCHMARKS:
+        BENCHMARKS[name]()
+
+    print("🏁 БЕНЧМАРКИ ЗАВЕРШЕНЫ! 🏁")
+
+
+if __name__ == "__main__":
+    run_all_benchmarks(sys.argv[1:])
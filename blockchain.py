@@ -1,24 +1,107 @@
 # blockchain.py
+import bisect
 import hashlib
+import itertools
 import json
+import math
+import os
+import random
 import time
-from typing import List, Dict, Any, Tuple
+from collections import deque
+from typing import List, Dict, Any, Tuple, Callable, Optional, Iterable, Iterator, TextIO
 import uuid
-from datetime import datetime
+
+from execution import BlockExecutor
+from hashing import NonceSearch, MINING_BACKENDS
+from mempool import Mempool
+from metrics import Metrics, COUNT_BUCKETS
+from replay import SeenTransactionIndex
+from storage import BlockBodyStore
+from wallets import WalletRegistry
+
+
+SNAPSHOT_FORMAT = 1
+MEDIAN_TIME_SPAN = 11
+MAX_FUTURE_BLOCK_TIME = 7200
+
+# Один uuid4 на процесс, дальше - дешевый счетчик
+_ID_PREFIX = uuid.uuid4().hex[:16]
+_id_counter = itertools.count()
+
+
+def default_transaction_id() -> str:
+    return f"{_ID_PREFIX}-{next(_id_counter)}"
+
+
+class CounterClock:
+    def __init__(self, start: float = 0.0, step: float = 1.0):
+        self.current = start
+        self.step = step
+
+    def __call__(self) -> float:
+        value = self.current
+        self.current += self.step
+        return value
+
+
+class CounterIdFactory:
+    def __init__(self, prefix: str = "tx", start: int = 0):
+        self.prefix = prefix
+        self._counter = itertools.count(start)
+
+    def __call__(self) -> str:
+        return f"{self.prefix}-{next(self._counter)}"
+
+
+class SeededIdFactory:
+    def __init__(self, seed: int = 0):
+        self._rng = random.Random(seed)
+
+    def __call__(self) -> str:
+        return str(uuid.UUID(int=self._rng.getrandbits(128), version=4))
+
+
+class MedianTimeWindow:
+    def __init__(self, size: int = MEDIAN_TIME_SPAN):
+        self.size = size
+        self.timestamps: deque = deque()
+        self.sorted_timestamps: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def add(self, timestamp: float):
+        self.timestamps.append(timestamp)
+        bisect.insort(self.sorted_timestamps, timestamp)
+        if len(self.timestamps) > self.size:
+            oldest = self.timestamps.popleft()
+            del self.sorted_timestamps[bisect.bisect_left(self.sorted_timestamps, oldest)]
+
+    def median(self) -> Optional[float]:
+        if not self.sorted_timestamps:
+            return None
+        return self.sorted_timestamps[len(self.sorted_timestamps) // 2]
+
+    def copy(self) -> 'MedianTimeWindow':
+        window = MedianTimeWindow(self.size)
+        window.timestamps = deque(self.timestamps)
+        window.sorted_timestamps = list(self.sorted_timestamps)
+        return window
 
 
 class Transaction:
-    def __init__(self, sender: str, receiver: str, amount: float):
+    def __init__(self, sender: str, receiver: str, amount: float,
+                 timestamp: float = None, transaction_id: str = None):
         self.sender = sender
         self.receiver = receiver
         self.amount = amount
         self.signature = None
-        self.transaction_id = str(uuid.uuid4())
-        self.timestamp = time.time()
+        self.transaction_id = transaction_id if transaction_id is not None else default_transaction_id()
+        self.timestamp = timestamp if timestamp is not None else time.time()
         self.fee = 0.0
 
-    def to_dict(self) -> Dict[str, Any]:
-        return {
+    def to_dict(self, include_signature: bool = False) -> Dict[str, Any]:
+        data = {
             'transaction_id': self.transaction_id,
             'sender': self.sender,
             'receiver': self.receiver,
@@ -26,11 +109,25 @@ class Transaction:
             'fee': self.fee,
             'timestamp': self.timestamp
         }
+        if include_signature:
+            data['signature'] = self.signature
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Transaction':
+        transaction = cls(data['sender'], data['receiver'], data['amount'],
+                          timestamp=data['timestamp'], transaction_id=data['transaction_id'])
+        transaction.fee = data.get('fee', 0.0)
+        transaction.signature = data.get('signature')
+        return transaction
 
     def calculate_hash(self) -> str:
         transaction_string = json.dumps(self.to_dict(), sort_keys=True)
         return hashlib.sha256(transaction_string.encode()).hexdigest()
 
+    def get_size(self) -> int:
+        return len(json.dumps(self.to_dict(include_signature=True)).encode())
+
     def sign_transaction(self, private_key: str = None):
         if private_key is None:
             self.signature = f"signed_{self.calculate_hash()}"
@@ -83,16 +180,19 @@ class Transaction:
 
 
 class Block:
+    body_store = None
+
     def __init__(self, index: int, transactions: List[Transaction], previous_hash: str, timestamp: float = None):
         self.index = index
         self.transactions = transactions
         self.previous_hash = previous_hash
-        self.timestamp = timestamp or time.time()
+        self.timestamp = timestamp if timestamp is not None else time.time()
         self.nonce = 0
         self.difficulty = 0
         self.miner = None
         self.hash = self.calculate_hash()
         self.mining_duration = 0
+        self.mining_attempts = 0
 
     def calculate_hash(self) -> str:
         block_string = json.dumps({
@@ -105,7 +205,62 @@ class Block:
         }, sort_keys=True)
         return hashlib.sha256(block_string.encode()).hexdigest()
 
-    def mine_block(self, difficulty: int, miner_address: str = None):
+    @property
+    def transactions(self) -> List[Transaction]:
+        if self._transactions is None and self.body_store is not None:
+            # Тело блока вынесено в архив - читаем по запросу, не возвращая его в память
+            return [Transaction.from_dict(tx) for tx in self.body_store.load(self.index)]
+        return self._transactions
+
+    @transactions.setter
+    def transactions(self, transactions: List[Transaction]):
+        self._transactions = transactions
+
+    @property
+    def is_pruned(self) -> bool:
+        return self._transactions is None and self.body_store is not None
+
+    def prune_body(self, body_store):
+        if self.is_pruned:
+            return
+        body_store.store(self.index, [tx.to_dict(include_signature=True) for tx in self._transactions])
+        self.body_store = body_store
+        self._transactions = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'index': self.index,
+            'transactions': [tx.to_dict(include_signature=True) for tx in self.transactions],
+            'previous_hash': self.previous_hash,
+            'timestamp': self.timestamp,
+            'nonce': self.nonce,
+            'difficulty': self.difficulty,
+            'miner': self.miner,
+            'hash': self.hash,
+            'mining_duration': self.mining_duration
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Block':
+        # Хеш берется из данных как есть - пересчет остается за валидацией
+        block = cls.__new__(cls)
+        block.index = data['index']
+        block.transactions = [Transaction.from_dict(tx) for tx in data['transactions']]
+        block.previous_hash = data['previous_hash']
+        block.timestamp = data['timestamp']
+        block.nonce = data['nonce']
+        block.difficulty = data['difficulty']
+        block.miner = data.get('miner')
+        block.hash = data['hash']
+        block.mining_duration = data.get('mining_duration', 0)
+        block.mining_attempts = 0
+        return block
+
+    def mine_block(self, difficulty: int, miner_address: str = None, backend: str = 'batch',
+                   batch_size: int = 10000):
+        if backend not in MINING_BACKENDS:
+            raise ValueError(f"Неизвестный бэкенд майнинга: {backend}")
+
         self.difficulty = difficulty
         self.miner = miner_address
         target = "0" * difficulty
@@ -114,16 +269,30 @@ class Block:
         start_time = time.time()
         attempts = 0
 
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            attempts += 1
-            self.hash = self.calculate_hash()
+        if backend == 'batch':
+            search = NonceSearch(self)
+            while True:
+                found = search.search(self.nonce, batch_size, difficulty)
+                if found is not None:
+                    attempts += found - self.nonce + 1
+                    self.nonce = found
+                    self.hash = search.hash_nonce(found)
+                    break
+                self.nonce += batch_size
+                attempts += batch_size
+                print(f"  Попыток: {attempts}, nonce: {self.nonce}...")
+        else:
+            while self.hash[:difficulty] != target:
+                self.nonce += 1
+                attempts += 1
+                self.hash = self.calculate_hash()
 
-            if attempts % 10000 == 0:
-                print(f"  Попыток: {attempts}, текущий хеш: {self.hash[:20]}...")
+                if attempts % 10000 == 0:
+                    print(f"  Попыток: {attempts}, текущий хеш: {self.hash[:20]}...")
 
         end_time = time.time()
         self.mining_duration = end_time - start_time
+        self.mining_attempts = attempts
 
         print(f"Блок #{self.index} успешно замайнен!")
         print(f"   Хеш: {self.hash}")
@@ -142,26 +311,33 @@ class Block:
     def get_total_fees(self) -> float:
         return sum(tx.fee for tx in self.transactions if tx.sender != "0")
 
-    def verify_integrity(self) -> Tuple[bool, str]:
+    def get_size(self) -> int:
+        return sum(tx.get_size() for tx in self.transactions)
+
+    def verify_integrity(self, current_time: float = None,
+                         max_future_time: float = MAX_FUTURE_BLOCK_TIME) -> Tuple[bool, str]:
         try:
-            calculated_hash = self.calculate_hash()
-            if self.hash != calculated_hash:
-                return False, f"Хеш блока не совпадает. Ожидался: {calculated_hash}"
+            # У обрезанного блока проверяется только заголовок: тело лежит в архиве
+            if not self.is_pruned:
+                calculated_hash = self.calculate_hash()
+                if self.hash != calculated_hash:
+                    return False, f"Хеш блока не совпадает. Ожидался: {calculated_hash}"
+
+                if not isinstance(self.transactions, list):
+                    return False, "Транзакции должны быть списком"
 
             if self.index < 0:
                 return False, "Индекс блока должен быть неотрицательным"
 
-            if not isinstance(self.transactions, list):
-                return False, "Транзакции должны быть списком"
-
             if not self.previous_hash:
                 return False, "Отсутствует хеш предыдущего блока"
 
             if self.difficulty > 0 and not self.hash.startswith("0" * self.difficulty):
                 return False, f"Блок не удовлетворяет сложности {self.difficulty}"
 
-            current_time = time.time()
-            if self.timestamp > current_time + 7200:
+            if current_time is None:
+                current_time = time.time()
+            if self.timestamp > current_time + max_future_time:
                 return False, "Временная метка блока в будущем"
 
             return True, "Блок валиден"
@@ -170,22 +346,93 @@ class Block:
             return False, f"Ошибка при проверке блока: {str(e)}"
 
 
+def write_ndjson_blocks(blocks: Iterable[Block], fp: TextIO) -> int:
+    count = 0
+    for block in blocks:
+        fp.write(json.dumps(block.to_dict()))
+        fp.write("\n")
+        count += 1
+    return count
+
+
+def read_ndjson_blocks(fp: TextIO) -> Iterator[Block]:
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield Block.from_dict(json.loads(line))
+
+
+def check_block_proof(block: Block) -> Tuple[int, bool, str]:
+    calculated_hash = block.calculate_hash()
+    if block.hash != calculated_hash:
+        return block.index, False, f"Хеш блока не совпадает. Ожидался: {calculated_hash}"
+
+    if block.difficulty > 0 and not block.hash.startswith("0" * block.difficulty):
+        return block.index, False, f"Блок не удовлетворяет сложности {block.difficulty}"
+
+    return block.index, True, "Блок валиден"
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
 class Blockchain:
-    def __init__(self, difficulty: int = 2):
+    def __init__(self, difficulty: int = 2, clock: Callable[[], float] = None,
+                 id_factory: Callable[[], str] = None, metrics: Metrics = None,
+                 mempool: Mempool = None, wallet_shards: int = 1,
+                 prune_depth: int = None, archive_dir: str = None):
+        if prune_depth is not None and (prune_depth < 1 or archive_dir is None):
+            raise ValueError("Для обрезки нужна глубина не меньше 1 и каталог архива")
+        self.clock: Callable[[], float] = clock or time.time
+        self.id_factory: Callable[[], str] = id_factory or default_transaction_id
+        self.metrics = metrics or Metrics()
         self.chain: List[Block] = [self.create_genesis_block()]
         self.difficulty = difficulty
-        self.pending_transactions: List[Transaction] = []
+        self.pending_transactions = mempool if mempool is not None else Mempool()
+        if self.pending_transactions.balance_of is None:
+            self.pending_transactions.balance_of = self.get_balance
+        if self.pending_transactions.clock is None:
+            self.pending_transactions.clock = self.clock
+        self.max_block_bytes = 1_000_000
+        self.mining_backend = 'batch'
+        self.block_executor = BlockExecutor()
+        self.max_future_block_time = MAX_FUTURE_BLOCK_TIME
+        self.time_window = MedianTimeWindow()
+        self.time_window.add(self.chain[0].timestamp)
         self.mining_reward = 50.0
         self.block_reward_halving_interval = 210000
-        self.wallets: Dict[str, float] = {}
+        self.wallets = WalletRegistry(num_shards=wallet_shards)
         self.total_blocks_mined = 0
         self.total_transactions_processed = 0
         self.security_log: List[str] = []
+        self.address_index: Dict[str, List[Tuple[int, int]]] = {}
+        # Точный индекс подтвержденных транзакций: id -> (высота, позиция) первого вхождения
+        self.transaction_index: Dict[str, Tuple[int, int]] = {}
+        self._index_block(self.chain[0])
+        self.seen_transactions = SeenTransactionIndex(exact_lookup=self._is_confirmed)
+        self._mark_seen(self.chain[0])
+        # Тела блоков глубже prune_depth уходят в архив пачками по prune_batch блоков
+        self.prune_depth = prune_depth
+        self.prune_batch = 100
+        self.pruned_height = -1
+        self.body_store = BlockBodyStore(archive_dir) if archive_dir is not None else None
 
     def create_genesis_block(self) -> Block:
-        genesis_transaction = Transaction("0", "founder", 50.0)
+        genesis_transaction = self.create_transaction("0", "founder", 50.0)
         genesis_transaction.sign_transaction()
-        return Block(0, [genesis_transaction], "0")
+        return Block(0, [genesis_transaction], "0", timestamp=self.clock())
+
+    def create_transaction(self, sender: str, receiver: str, amount: float, fee: float = 0.0) -> Transaction:
+        transaction = Transaction(sender, receiver, amount,
+                                  timestamp=self.clock(), transaction_id=self.id_factory())
+        transaction.fee = fee
+        return transaction
 
     def get_current_block_reward(self) -> float:
         halvings = self.total_blocks_mined // self.block_reward_halving_interval
@@ -205,63 +452,126 @@ class Blockchain:
         print(f"Создан кошелек '{name}' с балансом {initial_balance} BTC")
         return True
 
+    def create_wallets(self, names: Iterable[str], initial_balance: float = 100.0) -> int:
+        names = [name for name in names if name != "0"]
+        created = len(self.wallets.register_many(names, initial_balance))
+        print(f"Создано кошельков: {created} (пропущено: {len(names) - created}) с балансом {initial_balance} BTC")
+        return created
+
     def get_balance(self, wallet_name: str) -> float:
         return self.wallets.get(wallet_name, 0.0)
 
     def transfer(self, from_wallet: str, to_wallet: str, amount: float, fee: float = 0.1) -> bool:
-        if from_wallet not in self.wallets:
-            print(f"Кошелек отправителя '{from_wallet}' не найден")
+        transaction, message = self.prepare_transfer(from_wallet, to_wallet, amount, fee)
+        if transaction is None:
+            print(message)
             return False
 
+        if self.add_transaction(transaction):
+            print(f"Перевод: {from_wallet} -> {to_wallet}: {amount} BTC (комиссия: {fee} BTC)")
+            return True
+
+        return False
+
+    def prepare_transfer(self, from_wallet: str, to_wallet: str, amount: float,
+                         fee: float = 0.1) -> Tuple[Optional[Transaction], str]:
+        sender_id = self.wallets.id_of(from_wallet)
+        if sender_id is None:
+            return None, f"Кошелек отправителя '{from_wallet}' не найден"
+
         if to_wallet not in self.wallets:
-            print(f"Кошелек получателя '{to_wallet}' не найден")
-            return False
+            return None, f"Кошелек получателя '{to_wallet}' не найден"
 
         total_cost = amount + fee
-        if self.wallets[from_wallet] < total_cost:
-            print(f"Недостаточно средств. Нужно: {total_cost} BTC, доступно: {self.wallets[from_wallet]} BTC")
-            return False
+        available = self.wallets.balance_by_id(sender_id)
+        if available < total_cost:
+            return None, f"Недостаточно средств. Нужно: {total_cost} BTC, доступно: {available} BTC"
 
-        transaction = Transaction(from_wallet, to_wallet, amount)
-        transaction.fee = fee
+        transaction = self.create_transaction(from_wallet, to_wallet, amount, fee)
         transaction.sign_transaction()
+        return transaction, "Перевод подготовлен"
 
-        if self.add_transaction(transaction):
-            print(f"Перевод: {from_wallet} -> {to_wallet}: {amount} BTC (комиссия: {fee} BTC)")
-            return True
+    def check_spendable(self, transaction: Transaction, reserved: float = 0.0) -> Tuple[bool, str]:
+        # Для транзакций извне: подтвержденный баланс за вычетом уже ожидающих в пуле списаний
+        is_valid, message = transaction.verify_integrity()
+        if not is_valid:
+            return False, message
 
-        return False
+        if transaction.sender not in self.wallets:
+            return False, f"Кошелек отправителя '{transaction.sender}' не найден"
+
+        if transaction.receiver not in self.wallets:
+            return False, f"Кошелек получателя '{transaction.receiver}' не найден"
+
+        total_cost = transaction.amount + transaction.fee
+        available = self.get_balance(transaction.sender) - \
+            self.pending_transactions.pending_outgoing(transaction.sender) - reserved
+        if available < total_cost:
+            return False, f"Недостаточно средств. Нужно: {total_cost} BTC, доступно: {available} BTC"
+        return True, "Транзакция может быть исполнена"
 
     def add_transaction(self, transaction: Transaction) -> bool:
-        if not transaction.is_valid():
-            print("Невалидная транзакция")
+        admitted, message = self._admit_transaction(transaction)
+        if not admitted:
+            print(message)
             return False
 
-        self.pending_transactions.append(transaction)
         print(f"Транзакция добавлена в пул: {transaction}")
         return True
 
-    def select_transactions_for_block(self, max_transactions: int = 10) -> List[Transaction]:
-        sorted_transactions = sorted(
-            self.pending_transactions,
-            key=lambda tx: tx.fee,
-            reverse=True
-        )
+    def add_transactions(self, transactions: Iterable[Transaction]) -> List[Tuple[bool, str]]:
+        # Пакетный путь: те же проверки, но без вывода по каждой транзакции
+        results = [self._admit_transaction(transaction) for transaction in transactions]
+        admitted = sum(1 for ok, _ in results if ok)
+        print(f"Пакет транзакций: принято {admitted} из {len(results)}")
+        if self.metrics.enabled:
+            self.metrics.inc('transactions_admitted_total', admitted)
+            self.metrics.set_gauge('mempool_size', len(self.pending_transactions))
+        return results
+
+    def _admit_transaction(self, transaction: Transaction) -> Tuple[bool, str]:
+        if not transaction.is_valid():
+            return False, "Невалидная транзакция"
+
+        if self.seen_transactions.contains(transaction):
+            return False, f"Транзакция уже подтверждена в цепи: {transaction}"
+
+        admitted, message = self.pending_transactions.admit(transaction)
+        if not admitted:
+            return False, f"{message}: {transaction}"
+
+        return True, "Транзакция добавлена в пул"
+
+    def select_transactions_for_block(self, max_transactions: int = 10,
+                                      max_block_bytes: int = None) -> List[Transaction]:
+        if max_block_bytes is None:
+            max_block_bytes = self.max_block_bytes
+
+        if self.pending_transactions.expiry_seconds is not None:
+            expired = self.pending_transactions.expire(self.clock())
+            if expired:
+                print(f"Удалено устаревших транзакций из пула: {expired}")
+
+        with self.metrics.timer('select_transactions_seconds'):
+            selected = self.pending_transactions.select(max_transactions, max_block_bytes)
 
-        selected = sorted_transactions[:max_transactions]
+        if self.metrics.enabled:
+            self._record_mempool_metrics()
 
         print(f"Отобрано {len(selected)} транзакций из {len(self.pending_transactions)}")
         total_fees = sum(tx.fee for tx in selected)
         print(f"Общая комиссия в блоке: {total_fees} BTC")
+        print(f"Размер блока: {self.pending_transactions.size_of(selected)} байт")
 
         return selected
 
-    def mine_pending_transactions(self, mining_reward_address: str, max_transactions: int = 10):
+    def mine_pending_transactions(self, mining_reward_address: str, max_transactions: int = 10,
+                                  max_block_bytes: int = None):
         if not self.pending_transactions:
             print("Нет транзакций для майнинга")
             return
 
-        selected_transactions = self.select_transactions_for_block(max_transactions)
+        selected_transactions = self.select_transactions_for_block(max_transactions, max_block_bytes)
 
         print(f"Начинаем майнинг блока #{len(self.chain)}...")
         print(f"Транзакций в блоке: {len(selected_transactions)}")
@@ -270,48 +580,402 @@ class Blockchain:
         new_block = Block(
             len(self.chain),
             selected_transactions,
-            self.get_latest_block().hash
+            self.get_latest_block().hash,
+            timestamp=self._next_block_timestamp()
         )
 
-        new_block.mine_block(self.difficulty, mining_reward_address)
+        with self.metrics.timer('mine_block_seconds'):
+            new_block.mine_block(self.difficulty, mining_reward_address, backend=self.mining_backend)
+
+        self._accept_block(new_block)
+
+    def create_block_template(self, max_transactions: int = 10, max_block_bytes: int = None,
+                              transactions: List[Transaction] = None) -> Block:
+        if transactions is None:
+            transactions = self.select_transactions_for_block(max_transactions, max_block_bytes)
+        template = Block(len(self.chain), transactions, self.get_latest_block().hash,
+                         timestamp=self._next_block_timestamp())
+        template.difficulty = self.difficulty
+        return template
+
+    def submit_block(self, block: Block) -> Tuple[bool, str]:
+        # Блок, найденный вне mine_pending_transactions (например, пулом майнеров)
+        tip = self.get_latest_block()
+        if block.index != len(self.chain) or block.previous_hash != tip.hash:
+            return False, "Блок построен не на текущей вершине цепи"
+
+        if block.difficulty < self.difficulty:
+            return False, f"Сложность блока ниже текущей ({self.difficulty})"
+
+        _, proof_valid, message = check_block_proof(block)
+        if not proof_valid:
+            return False, message
+
+        if block.timestamp <= self.median_time_past():
+            return False, "Временная метка не больше медианы предыдущих блоков"
+
+        for transaction in block.transactions:
+            if not transaction.is_valid() or self.seen_transactions.contains(transaction):
+                return False, f"Недопустимая транзакция в блоке: {transaction}"
+
+        self._accept_block(block)
+        return True, "Блок принят"
 
+    def _accept_block(self, new_block: Block):
         block_reward = self.get_current_block_reward()
         total_fees = new_block.get_total_fees()
 
-        reward_transaction = Transaction("0", mining_reward_address, block_reward)
+        reward_transaction = self.create_transaction("0", new_block.miner, block_reward)
         reward_transaction.sign_transaction()
 
-        for tx in selected_transactions:
-            if tx in self.pending_transactions:
-                self.pending_transactions.remove(tx)
-
         self.pending_transactions.append(reward_transaction)
-        self.chain.append(new_block)
+        self._append_block(new_block)
 
-        self._update_balances(new_block, block_reward)
+        with self.metrics.timer('update_balances_seconds'):
+            self._update_balances(new_block, block_reward)
 
         self.total_blocks_mined += 1
-        self.total_transactions_processed += len(selected_transactions)
+        self.total_transactions_processed += len(new_block.transactions)
+        self._maybe_prune()
+
+        if self.metrics.enabled:
+            self._record_block_metrics(new_block)
 
         print(f"Блок #{new_block.index} успешно добавлен в цепь!")
-        print(f"Майнер {mining_reward_address} получает: {block_reward + total_fees} BTC")
+        print(f"Майнер {new_block.miner} получает: {block_reward + total_fees} BTC")
         print(f"   (Награда за блок: {block_reward} BTC + комиссии: {total_fees} BTC)")
 
         self.print_network_stats()
 
-    def _update_balances(self, block: Block, block_reward: float):
-        total_fees = 0
-
+    def _append_block(self, block: Block):
+        self.chain.append(block)
+        self.time_window.add(block.timestamp)
+        self._index_block(block)
+        self._mark_seen(block)
         for transaction in block.transactions:
-            if transaction.sender != "0":
-                total_amount = transaction.amount + transaction.fee
-                self.wallets[transaction.sender] = self.get_balance(transaction.sender) - total_amount
-                total_fees += transaction.fee
+            self.pending_transactions.discard(transaction)
+
+    def _maybe_prune(self):
+        # Вызывается после применения балансов, чтобы снимок состояния совпадал с вершиной
+        if self.prune_depth is not None and \
+                len(self.chain) - 1 - self.pruned_height > self.prune_depth + self.prune_batch:
+            self.prune()
+
+    def prune(self, depth: int = None) -> int:
+        if self.body_store is None:
+            raise ValueError("Не задан каталог архива для обрезки цепи")
+        depth = self.prune_depth if depth is None else depth
+        if depth is None or depth < 1:
+            raise ValueError("Глубина обрезки должна быть не меньше 1")
+
+        keep_from = len(self.chain) - depth
+        pruned = 0
+        for height in range(self.pruned_height + 1, keep_from):
+            block = self.chain[height]
+            transactions = block.transactions
+            block.prune_body(self.body_store)
+            # Позиции архивных транзакций теперь в хранилище тел - в памяти остается только хвост цепи
+            for position, transaction in enumerate(transactions):
+                if self.transaction_index.get(transaction.transaction_id) == (height, position):
+                    del self.transaction_index[transaction.transaction_id]
+            pruned += 1
+        self.pruned_height = max(self.pruned_height, keep_from - 1)
+
+        if pruned:
+            # Снимок состояния рядом с архивом: балансы восстанавливаются без старых тел блоков
+            self.save_snapshot(os.path.join(self.body_store.directory, "state.snapshot"))
+            self.metrics.set_gauge('pruned_height', self.pruned_height)
+        return pruned
+
+    def _mark_seen(self, block: Block):
+        for transaction in block.transactions:
+            self.seen_transactions.add(transaction.transaction_id, transaction.timestamp)
+
+    def _is_confirmed(self, transaction: Transaction, before_height: int = None) -> bool:
+        entry = self.transaction_index.get(transaction.transaction_id)
+        if entry is None and self.body_store is not None:
+            entry = self.body_store.locate(transaction.transaction_id)
+        return entry is not None and (before_height is None or entry[0] < before_height)
+
+    def median_time_past(self) -> Optional[float]:
+        return self.time_window.median()
+
+    def _next_block_timestamp(self) -> float:
+        timestamp = self.clock()
+        median = self.median_time_past()
+        if median is not None and timestamp <= median:
+            timestamp = math.nextafter(median, math.inf)
+        return timestamp
+
+    def _index_block(self, block: Block):
+        for position, transaction in enumerate(block.transactions):
+            entry = (block.index, position)
+            self.transaction_index.setdefault(transaction.transaction_id, entry)
+            self.address_index.setdefault(transaction.sender, []).append(entry)
+            if transaction.receiver != transaction.sender:
+                self.address_index.setdefault(transaction.receiver, []).append(entry)
+
+    def rebuild_address_index(self, blocks: Iterable[Block] = None):
+        self.address_index = {}
+        self.transaction_index = {}
+        for block in (blocks if blocks is not None else self.chain):
+            self._index_block(block)
+
+    def get_wallet_history(self, wallet_name: str, limit: int = 50, offset: int = 0,
+                           include_pending: bool = False) -> List[Dict[str, Any]]:
+        history = []
+        skipped = 0
+
+        if include_pending:
+            for transaction in reversed(self.pending_transactions):
+                if transaction.sender != wallet_name and transaction.receiver != wallet_name:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                if len(history) >= limit:
+                    return history
+                history.append({'height': None, 'position': None,
+                                'confirmed': False, 'transaction': transaction})
+
+        entries = self.address_index.get(wallet_name, [])
+        start = len(entries) - 1 - (offset - skipped)
+        stop = max(start - (limit - len(history)), -1)
+        bodies: Dict[int, List[Transaction]] = {}
+        for i in range(start, stop, -1):
+            height, position = entries[i]
+            transactions = bodies.get(height)
+            if transactions is None:
+                # Архивное тело читается один раз на блок
+                transactions = bodies[height] = self.chain[height].transactions
+            history.append({'height': height, 'position': position, 'confirmed': True,
+                            'transaction': transactions[position]})
+
+        return history
+
+    def bulk_import(self, blocks: Iterable[Block], verify: bool = True, workers: int = 1,
+                    batch_size: int = 1000, checkpoint_path: str = None,
+                    resume: bool = False) -> Tuple[bool, List[str]]:
+        errors = []
+        imported = 0
+        resume_height = -1
+        resume_hash = None
+
+        if resume and checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            resume_height = checkpoint['height']
+            resume_hash = checkpoint['hash']
+            self.wallets = WalletRegistry(num_shards=self.wallets.num_shards)
+            self.wallets.update(checkpoint['wallets'])
+            self.total_blocks_mined = checkpoint['total_blocks_mined']
+            self.total_transactions_processed = checkpoint['total_transactions_processed']
+            print(f"Возобновление импорта с блока #{resume_height + 1}")
+
+        executor = None
+        if verify and workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=workers)
+
+        try:
+            with self.metrics.timer('bulk_import_seconds'):
+                for batch in _batched(blocks, batch_size):
+                    restored = [block for block in batch if block.index <= resume_height]
+                    for block in restored:
+                        self._restore_block(block)
+                    if restored and restored[-1].index == resume_height and self.get_latest_block().hash != resume_hash:
+                        errors.append(f"Блок #{resume_height}: не совпадает с контрольной точкой")
+                        break
+
+                    batch = batch[len(restored):]
+                    if not batch:
+                        continue
+
+                    valid_count = self._verify_import_batch(batch, verify, executor, errors)
+                    self._apply_import_batch(batch[:valid_count])
+                    imported += valid_count
+
+                    if checkpoint_path and valid_count:
+                        self.save_snapshot(checkpoint_path)
+
+                    if errors:
+                        break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        print(f"Импортировано блоков: {imported}, длина цепи: {len(self.chain)}")
+        return len(errors) == 0, errors
+
+    def import_ndjson(self, fp: TextIO, **kwargs) -> Tuple[bool, List[str]]:
+        return self.bulk_import(read_ndjson_blocks(fp), **kwargs)
+
+    def _restore_block(self, block: Block):
+        if block.index == 0:
+            self.chain = [block]
+            self.pruned_height = -1
+            self.time_window = MedianTimeWindow()
+            self.time_window.add(block.timestamp)
+            self.rebuild_address_index()
+            self.seen_transactions = SeenTransactionIndex(exact_lookup=self._is_confirmed)
+            self._mark_seen(block)
+        else:
+            self._append_block(block)
+
+    def _verify_import_batch(self, batch: List[Block], verify: bool, executor, errors: List[str]) -> int:
+        valid_count = self._check_import_structure(batch, verify, errors)
+        if not verify:
+            return valid_count
+
+        # PoW проверяется для всех блоков до структурной ошибки - иначе они применятся без проверки хеша
+        checked = batch[:valid_count]
+        if executor is not None:
+            results = executor.map(check_block_proof, checked, chunksize=64)
+        else:
+            results = map(check_block_proof, checked)
+
+        for i, (index, block_valid, block_msg) in enumerate(results):
+            if not block_valid:
+                errors.append(f"Блок #{index}: {block_msg}")
+                return i
+
+        return valid_count
+
+    def _check_import_structure(self, batch: List[Block], verify: bool, errors: List[str]) -> int:
+        tip = self.get_latest_block()
+        time_window = self.time_window.copy()
+        latest_allowed = self.clock() + self.max_future_block_time
+        batch_transaction_ids = set()
+        for i, block in enumerate(batch):
+            for transaction in block.transactions:
+                transaction_id = transaction.transaction_id
+                if transaction_id in batch_transaction_ids or (
+                        block.index > 0 and self.seen_transactions.contains(transaction)):
+                    errors.append(f"Блок #{block.index}: повторная транзакция {transaction_id}")
+                    return i
+                batch_transaction_ids.add(transaction_id)
+
+            if block.index == 0:
+                if len(self.chain) != 1 or i != 0:
+                    errors.append("Генезис-блок можно импортировать только в пустую цепь")
+                    return i
+                tip = block
+                time_window = MedianTimeWindow()
+                time_window.add(block.timestamp)
+                continue
+
+            if block.timestamp <= time_window.median() or block.timestamp > latest_allowed:
+                errors.append(f"Блок #{block.index}: недопустимая временная метка")
+                return i
+            time_window.add(block.timestamp)
+
+            if block.index != tip.index + 1:
+                errors.append(f"Блок #{block.index}: нарушена последовательность индексов")
+                return i
+
+            if block.previous_hash != tip.hash:
+                errors.append(f"Блок #{block.index}: нарушена связь с предыдущим блоком")
+                return i
+
+            if verify and not block.has_valid_transactions():
+                errors.append(f"Блок #{block.index}: содержит невалидные транзакции")
+                return i
+
+            if verify and block.get_size() > self.max_block_bytes:
+                errors.append(f"Блок #{block.index}: превышен лимит размера блока")
+                return i
+
+            tip = block
+
+        return len(batch)
+
+    def _apply_import_batch(self, batch: List[Block]):
+        deltas: Dict[str, float] = {}
+
+        for block in batch:
+            if block.index == 0:
+                self._restore_block(block)
+                continue
+
+            total_fees = 0
+            for transaction in block.transactions:
+                if transaction.sender != "0":
+                    deltas[transaction.sender] = deltas.get(transaction.sender, 0.0) - (transaction.amount + transaction.fee)
+                    total_fees += transaction.fee
+                deltas[transaction.receiver] = deltas.get(transaction.receiver, 0.0) + transaction.amount
+
+            if block.miner:
+                block_reward = self.get_current_block_reward()
+                deltas[block.miner] = deltas.get(block.miner, 0.0) + block_reward + total_fees
+
+            self._append_block(block)
+            self.total_blocks_mined += 1
+            self.total_transactions_processed += len(block.transactions)
+
+        wallet_ids = []
+        for name in deltas:
+            wallet_id = self.wallets.id_of(name)
+            wallet_ids.append(wallet_id if wallet_id is not None else self.wallets.register(name))
+        self.wallets.apply_deltas(wallet_ids, list(deltas.values()))
+        self._maybe_prune()
+
+    def save_snapshot(self, path: str):
+        tip = self.get_latest_block()
+        snapshot = {
+            'format': SNAPSHOT_FORMAT,
+            'height': tip.index,
+            'hash': tip.hash,
+            'timestamp': tip.timestamp,
+            'difficulty': self.difficulty,
+            'block_reward': self.get_current_block_reward(),
+            'total_blocks_mined': self.total_blocks_mined,
+            'total_transactions_processed': self.total_transactions_processed,
+            'wallets': dict(self.wallets)
+        }
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
+
+    def _update_balances(self, block: Block, block_reward: float):
+        self.block_executor.execute(self.wallets, block, block_reward)
+
+    def _record_block_metrics(self, block: Block):
+        self.metrics.inc('blocks_mined_total')
+        self.metrics.inc('transactions_confirmed_total', len(block.transactions))
+        self.metrics.inc('mining_attempts_total', block.mining_attempts)
+        self.metrics.observe('mining_attempts', block.mining_attempts, COUNT_BUCKETS)
+        if block.mining_duration > 0:
+            self.metrics.set_gauge('hash_rate', block.mining_attempts / block.mining_duration)
+        self.metrics.set_gauge('chain_length', len(self.chain))
+        self.metrics.set_gauge('mempool_size', len(self.pending_transactions))
+
+    def _record_mempool_metrics(self):
+        now = self.clock()
+        self.metrics.set_gauge('mempool_size', len(self.pending_transactions))
+        self.metrics.set_gauge('mempool_bytes', self.pending_transactions.total_bytes)
+        self.metrics.set_gauge('mempool_min_feerate', self.pending_transactions.current_min_feerate())
+        for reason, count in self.pending_transactions.eviction_counts.items():
+            self.metrics.set_gauge(f'mempool_evicted_{reason}', count)
+        # Возраст самой старой транзакции вместо наблюдения каждой записи пула на каждом блоке
+        oldest = self.pending_transactions.oldest_timestamp()
+        self.metrics.set_gauge('mempool_oldest_age_seconds', 0.0 if oldest is None else max(0.0, now - oldest))
+
+    def _record_mempool_ages(self):
+        # Распределение возрастов считается при выгрузке метрик, а не на каждом блоке
+        if not self.metrics.enabled:
+            return
+        now = self.clock()
+        self.metrics.set_histogram('mempool_age_seconds',
+                                   (max(0.0, now - tx.timestamp) for tx in self.pending_transactions))
 
-            self.wallets[transaction.receiver] = self.get_balance(transaction.receiver) + transaction.amount
+    def get_metrics(self) -> Dict[str, Any]:
+        self._record_mempool_ages()
+        return self.metrics.snapshot()
 
-        if block.miner:
-            self.wallets[block.miner] = self.get_balance(block.miner) + block_reward + total_fees
+    def export_metrics(self) -> str:
+        self._record_mempool_ages()
+        return self.metrics.to_prometheus()
 
     def print_network_stats(self):
         print(f"СТАТИСТИКА СЕТИ:")
@@ -320,47 +984,74 @@ class Blockchain:
         print(f"   Текущая награда за блок: {self.get_current_block_reward()} BTC")
         print(f"   Транзакций в пуле ожидания: {len(self.pending_transactions)}")
         print(f"   Кошельков в системе: {len(self.wallets)}")
+        if self.pruned_height >= 0:
+            print(f"   Блоков в архиве: {self.pruned_height + 1}")
+
+        if self.metrics.enabled:
+            print(f"   Хешрейт: {self.metrics.gauges.get('hash_rate', 0.0):.0f} H/s")
+            for name in ('mine_block_seconds', 'select_transactions_seconds',
+                         'update_balances_seconds', 'chain_validation_seconds'):
+                histogram = self.metrics.histograms.get(name)
+                if histogram is not None:
+                    print(f"   {name}: {histogram.total:.4f} сек за {histogram.count} вызовов")
 
     def is_chain_valid(self, verbose: bool = False) -> Tuple[bool, List[str]]:
+        with self.metrics.timer('chain_validation_seconds'):
+            return self.validate_blocks(self.iter_blocks(), verbose, exact_lookup=self._is_confirmed)
+
+    def validate_blocks(self, blocks: Iterable[Block], verbose: bool = False,
+                        exact_lookup: Callable[..., bool] = None) -> Tuple[bool, List[str]]:
         errors = []
 
-        genesis_block = self.chain[0]
-        genesis_valid, genesis_msg = genesis_block.verify_integrity()
-        if not genesis_valid:
-            errors.append(f"Генезис-блок: {genesis_msg}")
+        def report(error_msg: str):
+            errors.append(error_msg)
             if verbose:
-                print(f"Генезис-блок: {genesis_msg}")
-
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
+                print(error_msg)
+
+        now = self.clock()
+        time_window = MedianTimeWindow()
+        seen = SeenTransactionIndex(exact_lookup=exact_lookup)
+        previous_block = None
+        for current_block in blocks:
+            # Для обрезанных блоков проверяются заголовки и связи, тела - только у оставшейся части
+            pruned = current_block.is_pruned
+            for transaction in ([] if pruned else current_block.transactions):
+                if seen.contains(transaction, current_block.index):
+                    report(f"Блок #{current_block.index}: повторная транзакция {transaction.transaction_id}")
+                seen.add(transaction.transaction_id, transaction.timestamp)
+
+            if previous_block is None:
+                genesis_valid, genesis_msg = current_block.verify_integrity(now, self.max_future_block_time)
+                if not genesis_valid:
+                    report(f"Генезис-блок: {genesis_msg}")
+                time_window.add(current_block.timestamp)
+                previous_block = current_block
+                continue
 
             if verbose:
                 print(f"Проверка блока #{current_block.index}...")
 
-            block_valid, block_msg = current_block.verify_integrity()
+            block_valid, block_msg = current_block.verify_integrity(now, self.max_future_block_time)
             if not block_valid:
-                errors.append(f"Блок #{current_block.index}: {block_msg}")
-                if verbose:
-                    print(f"Блок #{current_block.index}: {block_msg}")
+                report(f"Блок #{current_block.index}: {block_msg}")
+
+            if current_block.timestamp <= time_window.median():
+                report(f"Блок #{current_block.index}: временная метка не больше медианы предыдущих блоков")
+            time_window.add(current_block.timestamp)
 
             if current_block.previous_hash != previous_block.hash:
-                error_msg = f"Блок #{current_block.index}: нарушена связь с предыдущим блоком"
-                errors.append(error_msg)
-                if verbose:
-                    print(error_msg)
+                report(f"Блок #{current_block.index}: нарушена связь с предыдущим блоком")
+
+            if not pruned and not current_block.has_valid_transactions():
+                report(f"Блок #{current_block.index}: содержит невалидные транзакции")
 
-            if not current_block.has_valid_transactions():
-                error_msg = f"Блок #{current_block.index}: содержит невалидные транзакции"
-                errors.append(error_msg)
-                if verbose:
-                    print(error_msg)
+            if not pruned and current_block.get_size() > self.max_block_bytes:
+                report(f"Блок #{current_block.index}: превышен лимит размера блока")
 
             if current_block.index != previous_block.index + 1:
-                error_msg = f"Блок #{current_block.index}: нарушена последовательность индексов"
-                errors.append(error_msg)
-                if verbose:
-                    print(error_msg)
+                report(f"Блок #{current_block.index}: нарушена последовательность индексов")
+
+            previous_block = current_block
 
         is_valid = len(errors) == 0
         if is_valid and verbose:
@@ -368,6 +1059,25 @@ class Blockchain:
 
         return is_valid, errors
 
+    def iter_blocks(self, start: int = 0, stop: int = None) -> Iterator[Block]:
+        stop = len(self.chain) if stop is None else min(stop, len(self.chain))
+        for height in range(max(start, 0), stop):
+            yield self.chain[height]
+
+    def iter_transactions(self, predicate: Callable[[Transaction], bool] = None,
+                          start: int = 0, stop: int = None) -> Iterator[Tuple[int, int, Transaction]]:
+        for block in self.iter_blocks(start, stop):
+            for position, transaction in enumerate(block.transactions):
+                if predicate is None or predicate(transaction):
+                    yield block.index, position, transaction
+
+    def export_ndjson(self, fp: TextIO, start: int = 0, stop: int = None) -> int:
+        return write_ndjson_blocks(self.iter_blocks(start, stop), fp)
+
+    def export_archive(self, path: str, start: int = 0, stop: int = None, **kwargs) -> int:
+        from archive import write_archive
+        return write_archive(self.iter_blocks(start, stop), path, **kwargs)
+
     def get_latest_block(self) -> Block:
         return self.chain[-1]
 
@@ -376,7 +1086,7 @@ class Blockchain:
 
     def print_chain(self):
         print(f"БЛОКЧЕЙН (всего блоков: {len(self.chain)})")
-        for block in self.chain:
+        for block in self.iter_blocks():
             print(f"Блок #{block.index}:")
             print(f"  Хеш: {block.hash}")
             print(f"  Предыдущий: {block.previous_hash}")
@@ -0,0 +1,117 @@
+# execution.py
+from typing import List, Dict
+
+from wallets import WalletRegistry
+
+
+def apply_block_serial(wallets: WalletRegistry, block, block_reward: float):
+    total_fees = 0
+
+    for transaction in block.transactions:
+        if transaction.sender != "0":
+            total_amount = transaction.amount + transaction.fee
+            wallets[transaction.sender] = wallets.get(transaction.sender, 0.0) - total_amount
+            total_fees += transaction.fee
+
+        wallets[transaction.receiver] = wallets.get(transaction.receiver, 0.0) + transaction.amount
+
+    if block.miner:
+        wallets[block.miner] = wallets.get(block.miner, 0.0) + block_reward + total_fees
+
+
+class _Group:
+    __slots__ = ('positions', 'wallet_ids', 'deltas', 'unique')
+
+    def __init__(self):
+        self.positions: List[int] = []
+        self.wallet_ids: List[int] = []
+        self.deltas: List[float] = []
+        self.unique = True
+
+
+class BlockExecutor:
+    def __init__(self, executor=None, min_transactions: int = 64, max_group_ratio: float = 0.25):
+        self.executor = executor
+        self.min_transactions = min_transactions
+        self.max_group_ratio = max_group_ratio
+        self.last_mode = None
+        self.last_group_count = 0
+
+    def partition(self, wallets: WalletRegistry, transactions) -> List[List[int]]:
+        return [group.positions for group in self._build_groups(wallets, transactions)]
+
+    def _build_groups(self, wallets: WalletRegistry, transactions) -> List[_Group]:
+        # Транзакция попадает в группу после последней группы, где встречались ее кошельки,
+        # поэтому внутри группы кошельки не пересекаются, а порядок по каждому кошельку сохраняется
+        groups: List[_Group] = []
+        last_group: Dict[int, int] = {}
+        ids = wallets.ids
+        register = wallets.register
+
+        for position, transaction in enumerate(transactions):
+            receiver_id = ids.get(transaction.receiver)
+            if transaction.sender != "0":
+                sender_id = ids.get(transaction.sender)
+                if sender_id is None:
+                    sender_id = register(transaction.sender, 0.0)
+                if receiver_id is None:
+                    receiver_id = register(transaction.receiver, 0.0)
+                index = max(last_group.get(sender_id, -1), last_group.get(receiver_id, -1)) + 1
+                last_group[sender_id] = index
+            else:
+                sender_id = None
+                if receiver_id is None:
+                    receiver_id = register(transaction.receiver, 0.0)
+                index = last_group.get(receiver_id, -1) + 1
+            last_group[receiver_id] = index
+
+            if index == len(groups):
+                groups.append(_Group())
+            group = groups[index]
+            group.positions.append(position)
+            if sender_id is not None:
+                group.wallet_ids.append(sender_id)
+                group.deltas.append(-(transaction.amount + transaction.fee))
+                if sender_id == receiver_id:
+                    group.unique = False
+            group.wallet_ids.append(receiver_id)
+            group.deltas.append(transaction.amount)
+
+        return groups
+
+    def execute(self, wallets: WalletRegistry, block, block_reward: float):
+        transactions = block.transactions
+        # Построение групп на Python дороже последовательного цикла - группы имеют смысл
+        # только при параллельном применении по шардам, поэтому без executor путь последовательный
+        if self.executor is None or len(transactions) < self.min_transactions:
+            self._execute_serial(wallets, block, block_reward)
+            return
+
+        groups = self._build_groups(wallets, transactions)
+        if len(groups) > len(transactions) * self.max_group_ratio:
+            # Слишком много конфликтов - группы получаются мелкими, выгоднее применить по порядку
+            self._execute_serial(wallets, block, block_reward)
+            self.last_group_count = len(groups)
+            return
+
+        total_fees = 0
+        for transaction in transactions:
+            if transaction.sender != "0":
+                total_fees += transaction.fee
+
+        for group in groups:
+            if group.unique:
+                wallets.apply_unique_deltas(group.wallet_ids, group.deltas, executor=self.executor)
+            else:
+                wallets.apply_deltas(group.wallet_ids, group.deltas, executor=self.executor)
+
+        if block.miner:
+            wallets[block.miner] = wallets.get(block.miner, 0.0) + block_reward + total_fees
+
+        self.last_mode = 'grouped'
+        self.last_group_count = len(groups)
+
+    def _execute_serial(self, wallets: WalletRegistry, block, block_reward: float):
+        apply_block_serial(wallets, block, block_reward)
+        self.last_mode = 'serial'
+        self.last_group_count = 0
@@ -0,0 +1,67 @@
+# hashing.py
+import hashlib
+import json
+from typing import Optional, Tuple
+
+MINING_BACKENDS = ('python', 'batch')
+
+_NONCE_MARKER = "__nonce_placeholder__"
+
+
+def split_block_header(block) -> Tuple[bytes, bytes]:
+    # Та же сериализация, что и в Block.calculate_hash, но с разрывом на месте nonce
+    block_string = json.dumps({
+        'index': block.index,
+        'transactions': [tx.to_dict() for tx in block.transactions],
+        'previous_hash': block.previous_hash,
+        'timestamp': block.timestamp,
+        'nonce': _NONCE_MARKER,
+        'difficulty': block.difficulty
+    }, sort_keys=True)
+    # Ключи отсортированы: до nonce идут только difficulty и index, поэтому первое вхождение - нужное
+    prefix, _, suffix = block_string.partition(f'"{_NONCE_MARKER}"')
+    return prefix.encode(), suffix.encode()
+
+
+def meets_difficulty(digest: bytes, difficulty: int) -> bool:
+    # difficulty нулей в hex - это difficulty // 2 нулевых байт и, при нечетной, старший полубайт
+    full_bytes, half_byte = divmod(difficulty, 2)
+    if digest[:full_bytes] != bytes(full_bytes):
+        return False
+    return not half_byte or digest[full_bytes] < 0x10
+
+
+class NonceSearch:
+    def __init__(self, block):
+        prefix, self.suffix = split_block_header(block)
+        self.midstate = hashlib.sha256(prefix)
+
+    @classmethod
+    def from_header(cls, prefix: bytes, suffix: bytes) -> 'NonceSearch':
+        # Для воркеров в других процессах: заголовок передается байтами, без объекта блока
+        search = cls.__new__(cls)
+        search.suffix = suffix
+        search.midstate = hashlib.sha256(prefix)
+        return search
+
+    def hash_nonce(self, nonce: int) -> str:
+        h = self.midstate.copy()
+        h.update(str(nonce).encode())
+        h.update(self.suffix)
+        return h.hexdigest()
+
+    def search(self, start: int, count: int, difficulty: int) -> Optional[int]:
+        midstate = self.midstate
+        suffix = self.suffix
+        full_bytes, half_byte = divmod(difficulty, 2)
+        zero_prefix = bytes(full_bytes)
+
+        for nonce in range(start, start + count):
+            h = midstate.copy()
+            h.update(str(nonce).encode())
+            h.update(suffix)
+            digest = h.digest()
+            if digest[:full_bytes] == zero_prefix and (not half_byte or digest[full_bytes] < 0x10):
+                return nonce
+
+        return None
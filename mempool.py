@@ -0,0 +1,381 @@
+# mempool.py
+import heapq
+import itertools
+import time
+from typing import List, Dict, Iterator, Optional, Callable, Set, Tuple, Any
+
+
+class MempoolEntry:
+    __slots__ = ('transaction', 'size', 'sequence', 'version',
+                 'parents', 'children', 'ancestors', 'ancestor_fee', 'ancestor_size')
+
+    def __init__(self, transaction, size: int, sequence: int):
+        self.transaction = transaction
+        self.size = size
+        self.sequence = sequence
+        self.version = 0
+        self.parents: Set[str] = set()
+        self.children: Set[str] = set()
+        self.ancestors: Set[str] = set()
+        self.ancestor_fee = transaction.fee
+        self.ancestor_size = size
+
+    @property
+    def feerate(self) -> float:
+        return self.transaction.fee / self.size if self.size else 0.0
+
+    @property
+    def ancestor_score(self) -> float:
+        # Комиссия за байт всего пакета: транзакция вместе с неподтвержденными предками
+        return self.ancestor_fee / self.ancestor_size if self.ancestor_size else 0.0
+
+
+class Mempool:
+    def __init__(self, balance_of: Callable[[str], float] = None, max_transactions: int = None,
+                 max_pool_bytes: int = None, expiry_seconds: float = None,
+                 min_feerate: float = 0.0, surge_multiplier: float = 9.0,
+                 clock: Callable[[], float] = None):
+        self.entries: Dict[str, MempoolEntry] = {}
+        self.total_bytes = 0
+        self.balance_of = balance_of
+        # Текущее время для истечения срока; Blockchain подставляет свои часы
+        self.clock = clock
+        self.max_transactions = max_transactions
+        self.max_pool_bytes = max_pool_bytes
+        self.expiry_seconds = expiry_seconds
+        self.min_feerate = min_feerate
+        self.surge_multiplier = surge_multiplier
+        self.eviction_counts: Dict[str, int] = {'pool_full': 0, 'expired': 0}
+        self.rejection_counts: Dict[str, int] = {'duplicate': 0, 'low_fee': 0, 'pool_full': 0, 'expired': 0}
+        self._sequence = itertools.count()
+        # Куча по убыванию ancestor_score, устаревшие записи удаляются лениво
+        self._by_score: List[tuple] = []
+        # Кучи для вытеснения: самая дешевая за байт и самая старая транзакция сверху
+        self._by_feerate: List[tuple] = []
+        self._by_age: List[tuple] = []
+        self._outgoing: Dict[str, float] = {}
+        self._incoming: Dict[str, Dict[str, None]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __bool__(self) -> bool:
+        return bool(self.entries)
+
+    def __iter__(self) -> Iterator:
+        return (entry.transaction for entry in self.entries.values())
+
+    def __reversed__(self) -> Iterator:
+        return (entry.transaction for entry in reversed(self.entries.values()))
+
+    def __contains__(self, transaction) -> bool:
+        entry = self.entries.get(transaction.transaction_id)
+        return entry is not None and entry.transaction is transaction
+
+    def get(self, transaction_id: str):
+        entry = self.entries.get(transaction_id)
+        return entry.transaction if entry is not None else None
+
+    def size_of(self, transactions) -> int:
+        # Размеры записей посчитаны при добавлении - без повторной сериализации
+        return sum(self.entries[transaction.transaction_id].size for transaction in transactions)
+
+    def add(self, transaction) -> bool:
+        return self.admit(transaction)[0]
+
+    def admit(self, transaction) -> Tuple[bool, str]:
+        transaction_id = transaction.transaction_id
+        if transaction_id in self.entries:
+            self.rejection_counts['duplicate'] += 1
+            return False, "Транзакция уже находится в пуле"
+
+        coinbase = transaction.sender == "0"
+        if self.expiry_seconds is not None:
+            now = self.now()
+            self.expire(now)
+            if not coinbase and transaction.timestamp < now - self.expiry_seconds:
+                self.rejection_counts['expired'] += 1
+                return False, "Срок действия транзакции истек"
+
+        entry = MempoolEntry(transaction, transaction.get_size(), next(self._sequence))
+
+        if not coinbase:
+            min_feerate = self.current_min_feerate()
+            if entry.feerate < min_feerate:
+                self.rejection_counts['low_fee'] += 1
+                return False, f"Комиссия за байт {entry.feerate:.8f} ниже минимальной {min_feerate:.8f}"
+
+        for parent_id in self._find_funding_parents(transaction):
+            parent = self.entries[parent_id]
+            entry.parents.add(parent_id)
+            entry.ancestors.add(parent_id)
+            entry.ancestors |= parent.ancestors
+            parent.children.add(transaction_id)
+
+        for ancestor_id in entry.ancestors:
+            ancestor = self.entries[ancestor_id]
+            entry.ancestor_fee += ancestor.transaction.fee
+            entry.ancestor_size += ancestor.size
+
+        self.entries[transaction_id] = entry
+        self.total_bytes += entry.size
+        self._track_balances(transaction, 1)
+        self._push(entry)
+        # Выплаты наград уже заработаны блоком - их нельзя вытеснить или просрочить
+        if not coinbase:
+            heapq.heappush(self._by_feerate, (entry.feerate, -entry.sequence, transaction_id))
+            heapq.heappush(self._by_age, (transaction.timestamp, entry.sequence, transaction_id))
+
+        self._trim()
+        if transaction_id not in self.entries:
+            self.eviction_counts['pool_full'] -= 1
+            self.rejection_counts['pool_full'] += 1
+            return False, "Пул заполнен транзакциями с более высокой комиссией"
+
+        return True, "Транзакция добавлена в пул"
+
+    def append(self, transaction):
+        self.add(transaction)
+
+    def remove(self, transaction):
+        transaction_id = transaction.transaction_id
+        entry = self.entries.pop(transaction_id, None)
+        if entry is None:
+            raise ValueError(f"Транзакция {transaction_id} отсутствует в пуле")
+
+        self.total_bytes -= entry.size
+        self._track_balances(entry.transaction, -1)
+
+        for parent_id in entry.parents:
+            self.entries[parent_id].children.discard(transaction_id)
+
+        for descendant_id in self._descendants(entry):
+            descendant = self.entries[descendant_id]
+            descendant.parents.discard(transaction_id)
+            if transaction_id in descendant.ancestors:
+                descendant.ancestors.discard(transaction_id)
+                descendant.ancestor_fee -= entry.transaction.fee
+                descendant.ancestor_size -= entry.size
+                self._push(descendant)
+
+        self._compact_if_needed()
+
+    def discard(self, transaction) -> bool:
+        if transaction.transaction_id not in self.entries:
+            return False
+        self.remove(transaction)
+        return True
+
+    def clear(self):
+        self.entries.clear()
+        self._by_score.clear()
+        self._by_feerate.clear()
+        self._by_age.clear()
+        self._outgoing.clear()
+        self._incoming.clear()
+        self.total_bytes = 0
+
+    def fill_ratio(self) -> float:
+        ratios = [0.0]
+        if self.max_transactions:
+            ratios.append(len(self.entries) / self.max_transactions)
+        if self.max_pool_bytes:
+            ratios.append(self.total_bytes / self.max_pool_bytes)
+        return max(ratios)
+
+    def current_min_feerate(self) -> float:
+        # До половины заполнения действует базовый минимум, дальше он растет линейно
+        excess = max(0.0, self.fill_ratio() - 0.5) / 0.5
+        return self.min_feerate * (1 + self.surge_multiplier * excess)
+
+    def _over_limit(self) -> bool:
+        if self.max_transactions is not None and len(self.entries) > self.max_transactions:
+            return True
+        return self.max_pool_bytes is not None and self.total_bytes > self.max_pool_bytes
+
+    def _trim(self):
+        while self._over_limit() and self._by_feerate:
+            item = heapq.heappop(self._by_feerate)
+            entry = self.entries.get(item[2])
+            if entry is not None and entry.sequence == -item[1]:
+                self._evict(entry, 'pool_full')
+
+    def oldest_timestamp(self) -> Optional[float]:
+        # Устаревшие записи на вершине кучи удаляются лениво, как при expire
+        while self._by_age:
+            timestamp, sequence, transaction_id = self._by_age[0]
+            entry = self.entries.get(transaction_id)
+            if entry is not None and entry.sequence == sequence:
+                return timestamp
+            heapq.heappop(self._by_age)
+        return None
+
+    def now(self) -> float:
+        return (self.clock or time.time)()
+
+    def expire(self, now: float = None) -> int:
+        if self.expiry_seconds is None:
+            return 0
+
+        expired = 0
+        cutoff = (self.now() if now is None else now) - self.expiry_seconds
+        while self._by_age and self._by_age[0][0] < cutoff:
+            timestamp, sequence, transaction_id = heapq.heappop(self._by_age)
+            entry = self.entries.get(transaction_id)
+            if entry is not None and entry.sequence == sequence:
+                expired += self._evict(entry, 'expired')
+        return expired
+
+    def _evict(self, entry: MempoolEntry, reason: str) -> int:
+        # Вместе с транзакцией уходят ее потомки - без нее они не могут быть исполнены
+        evicted = 0
+        for transaction_id in reversed([entry.transaction.transaction_id] + self._descendants(entry)):
+            victim = self.entries.get(transaction_id)
+            if victim is not None:
+                self.remove(victim.transaction)
+                evicted += 1
+        self.eviction_counts[reason] += evicted
+        return evicted
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'transactions': len(self.entries),
+            'bytes': self.total_bytes,
+            'fill_ratio': self.fill_ratio(),
+            'min_feerate': self.current_min_feerate(),
+            'evicted': dict(self.eviction_counts),
+            'rejected': dict(self.rejection_counts)
+        }
+
+    def pending_outgoing(self, address: str) -> float:
+        return self._outgoing.get(address, 0.0)
+
+    def _find_funding_parents(self, transaction) -> List[str]:
+        if self.balance_of is None or transaction.sender == "0":
+            return []
+
+        available = self.balance_of(transaction.sender) - self._outgoing.get(transaction.sender, 0.0)
+        needed = transaction.amount + transaction.fee
+        parents = []
+        for parent_id in self._incoming.get(transaction.sender, ()):
+            if available >= needed:
+                break
+            parents.append(parent_id)
+            available += self.entries[parent_id].transaction.amount
+        return parents
+
+    def _track_balances(self, transaction, direction: int):
+        transaction_id = transaction.transaction_id
+        if transaction.sender != "0":
+            outgoing = self._outgoing.get(transaction.sender, 0.0) + direction * (transaction.amount + transaction.fee)
+            if direction < 0 and outgoing <= 1e-12:
+                self._outgoing.pop(transaction.sender, None)
+            else:
+                self._outgoing[transaction.sender] = outgoing
+
+        incoming = self._incoming.setdefault(transaction.receiver, {})
+        if direction > 0:
+            incoming[transaction_id] = None
+        else:
+            incoming.pop(transaction_id, None)
+            if not incoming:
+                del self._incoming[transaction.receiver]
+
+    def _descendants(self, entry: MempoolEntry) -> List[str]:
+        result = []
+        seen = set()
+        stack = list(entry.children)
+        while stack:
+            transaction_id = stack.pop()
+            if transaction_id in seen:
+                continue
+            seen.add(transaction_id)
+            result.append(transaction_id)
+            stack.extend(self.entries[transaction_id].children)
+        return result
+
+    def _push(self, entry: MempoolEntry):
+        entry.version += 1
+        heapq.heappush(self._by_score, (-entry.ancestor_score, entry.sequence,
+                                        entry.transaction.transaction_id, entry.version))
+
+    def _compact_if_needed(self):
+        limit = 2 * len(self.entries) + 64
+        if len(self._by_score) > limit:
+            self._by_score = [item for item in self._by_score if self._is_live(item)]
+            heapq.heapify(self._by_score)
+        if len(self._by_feerate) > limit:
+            self._by_feerate = [item for item in self._by_feerate
+                                if item[2] in self.entries and self.entries[item[2]].sequence == -item[1]]
+            heapq.heapify(self._by_feerate)
+        if len(self._by_age) > limit:
+            self._by_age = [item for item in self._by_age
+                            if item[2] in self.entries and self.entries[item[2]].sequence == item[1]]
+            heapq.heapify(self._by_age)
+
+    def _is_live(self, item: tuple) -> bool:
+        entry = self.entries.get(item[2])
+        return entry is not None and entry.version == item[3]
+
+    def select(self, max_count: Optional[int] = None, max_bytes: Optional[int] = None,
+               max_misses: int = 1000) -> List:
+        selected = []
+        in_block: Set[str] = set()
+        popped = []
+        # Пакеты, чья оценка упала после включения их предков в этот блок
+        modified: List[tuple] = []
+        remaining_bytes = max_bytes
+        misses = 0
+        heap = self._by_score
+
+        while heap or modified:
+            if max_count is not None and len(selected) >= max_count:
+                break
+
+            if modified and (not heap or modified[0] < heap[0]):
+                item = heapq.heappop(modified)
+            else:
+                item = heapq.heappop(heap)
+                if not self._is_live(item):
+                    continue
+                popped.append(item)
+
+            transaction_id = item[2]
+            if transaction_id in in_block:
+                continue
+
+            entry = self.entries[transaction_id]
+            package = [ancestor_id for ancestor_id in entry.ancestors if ancestor_id not in in_block]
+            package_fee = entry.transaction.fee
+            package_size = entry.size
+            for ancestor_id in package:
+                ancestor = self.entries[ancestor_id]
+                package_fee += ancestor.transaction.fee
+                package_size += ancestor.size
+
+            score = package_fee / package_size if package_size else 0.0
+            if score < -item[0]:
+                heapq.heappush(modified, (-score, item[1], transaction_id, item[3]))
+                continue
+
+            fits_bytes = remaining_bytes is None or package_size <= remaining_bytes
+            fits_count = max_count is None or len(selected) + len(package) + 1 <= max_count
+            if not (fits_bytes and fits_count):
+                # Жадная упаковка: пропускаем не влезающий пакет и пробуем следующие
+                misses += 1
+                if misses >= max_misses:
+                    break
+                continue
+
+            package.sort(key=lambda ancestor_id: self.entries[ancestor_id].sequence)
+            package.append(transaction_id)
+            for package_id in package:
+                in_block.add(package_id)
+                selected.append(self.entries[package_id].transaction)
+            if remaining_bytes is not None:
+                remaining_bytes -= package_size
+
+        for item in popped:
+            heapq.heappush(heap, item)
+
+        return selected
@@ -0,0 +1,286 @@
+# pool.py
+# Пул майнеров: координатор строит шаблон блока из пула транзакций и раздает воркерам
+# непересекающиеся диапазоны nonce. Воркеры присылают шары пониженной сложности -
+# по ним считается хешрейт и доля каждого в награде за найденный блок. Награду получает
+# адрес пула как обычный майнер, а воркерам она переводится обычными транзакциями с его баланса.
+import multiprocessing
+import queue
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from blockchain import Block, Blockchain
+from hashing import NonceSearch, split_block_header, meets_difficulty
+
+
+def _worker_main(worker_id: int, jobs, results, check_interval: int):
+    job = None
+    while True:
+        if job is None:
+            job = jobs.get()
+            if job is None:
+                return
+
+        template_id, prefix, suffix, share_difficulty, start, count = job
+        search = NonceSearch.from_header(prefix, suffix)
+        nonce, end = start, start + count
+        hashes = 0
+        next_job = False
+
+        while nonce < end:
+            step = min(check_interval, end - nonce)
+            found = search.search(nonce, step, share_difficulty)
+            if found is not None:
+                results.put(('share', worker_id, template_id, found))
+                hashes += found - nonce + 1
+                nonce = found + 1
+            else:
+                hashes += step
+                nonce += step
+
+            # Новый шаблон прерывает текущий диапазон без перезапуска процесса
+            try:
+                next_job = jobs.get_nowait()
+            except queue.Empty:
+                continue
+            break
+
+        results.put(('done', worker_id, template_id, hashes))
+        if next_job is None:
+            return
+        job = next_job or None
+
+
+class BlockTemplate:
+    def __init__(self, template_id: int, block: Block):
+        self.template_id = template_id
+        self.block = block
+        self.prefix, self.suffix = split_block_header(block)
+        self.search = NonceSearch.from_header(self.prefix, self.suffix)
+        self.transaction_ids = tuple(tx.transaction_id for tx in block.transactions)
+        self.total_fees = block.get_total_fees()
+        self.next_nonce = 0
+
+    def take_range(self, count: int) -> Tuple[int, int]:
+        start = self.next_nonce
+        self.next_nonce += count
+        return start, count
+
+
+class WorkerStats:
+    def __init__(self, address: str):
+        self.address = address
+        self.shares = 0
+        self.round_shares = 0
+        self.stale_shares = 0
+        self.invalid_shares = 0
+        self.hashes = 0
+
+    def to_dict(self, share_work: float, elapsed: float) -> Dict[str, Any]:
+        return {
+            'address': self.address,
+            'shares': self.shares,
+            'round_shares': self.round_shares,
+            'stale_shares': self.stale_shares,
+            'invalid_shares': self.invalid_shares,
+            'hashes': self.hashes,
+            # Оценка по шарам: каждый шар в среднем стоит 16^share_difficulty хешей
+            'hash_rate': (self.shares + self.stale_shares) * share_work / elapsed if elapsed > 0 else 0.0
+        }
+
+
+class MiningPool:
+    def __init__(self, blockchain: Blockchain, workers: List[str], pool_address: str = "Pool",
+                 share_difficulty: int = None, nonce_range: int = 20_000, max_transactions: int = 10,
+                 min_fee_gain: float = 0.0, check_interval: int = 2_000, payout_fee: float = 0.0):
+        if not workers:
+            raise ValueError("Пулу нужен хотя бы один воркер")
+        self.blockchain = blockchain
+        self.pool_address = pool_address
+        if share_difficulty is None:
+            share_difficulty = max(0, blockchain.difficulty - 2)
+        self.share_difficulty = min(share_difficulty, blockchain.difficulty)
+        self.nonce_range = nonce_range
+        self.max_transactions = max_transactions
+        self.min_fee_gain = min_fee_gain
+        self.check_interval = check_interval
+        self.payout_fee = payout_fee
+
+        self.stats = [WorkerStats(address) for address in workers]
+        self.templates: Dict[int, BlockTemplate] = {}
+        self.template: Optional[BlockTemplate] = None
+        self._next_template_id = 0
+        self.blocks_found = 0
+        self.started_at = None
+        self.round_started_at = None
+
+        self._context = multiprocessing.get_context()
+        self.results = self._context.Queue()
+        self.job_queues = []
+        self.processes = []
+
+    def start(self):
+        self.started_at = self.round_started_at = time.time()
+        self.refresh_template(force=True, dispatch=False)
+        for worker_id in range(len(self.stats)):
+            jobs = self._context.Queue()
+            process = self._context.Process(target=_worker_main,
+                                            args=(worker_id, jobs, self.results, self.check_interval),
+                                            daemon=True)
+            process.start()
+            self.job_queues.append(jobs)
+            self.processes.append(process)
+            self._send_job(worker_id)
+        print(f"Пул {self.pool_address}: запущено воркеров {len(self.processes)}, "
+              f"сложность шара {self.share_difficulty}")
+
+    def stop(self):
+        for jobs in self.job_queues:
+            jobs.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.job_queues = []
+        self.processes = []
+
+    def __enter__(self) -> 'MiningPool':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop()
+
+    def refresh_template(self, force: bool = False, dispatch: bool = True) -> bool:
+        tip = self.blockchain.get_latest_block()
+        current = self.template
+        stale = current is None or current.block.previous_hash != tip.hash
+
+        transactions = self.blockchain.select_transactions_for_block(self.max_transactions)
+        if not force and not stale:
+            # Перестройка только если набор изменился и выигрыш по комиссиям того стоит
+            if tuple(tx.transaction_id for tx in transactions) == current.transaction_ids:
+                return False
+            if sum(tx.fee for tx in transactions) - current.total_fees <= self.min_fee_gain:
+                return False
+
+        block = self.blockchain.create_block_template(transactions=transactions)
+        block.miner = self.pool_address
+        template = BlockTemplate(self._next_template_id, block)
+        self._next_template_id += 1
+
+        # Шары по старым шаблонам той же высоты еще приходят - держим их для проверки
+        self.templates = {template_id: old for template_id, old in self.templates.items()
+                          if old.block.index == block.index}
+        self.templates[template.template_id] = template
+        self.template = template
+
+        if dispatch:
+            for worker_id in range(len(self.job_queues)):
+                self._send_job(worker_id)
+        return True
+
+    def _send_job(self, worker_id: int):
+        template = self.template
+        start, count = template.take_range(self.nonce_range)
+        self.job_queues[worker_id].put((template.template_id, template.prefix, template.suffix,
+                                        self.share_difficulty, start, count))
+
+    def handle_result(self, message: Tuple) -> bool:
+        kind, worker_id, template_id, value = message
+        stats = self.stats[worker_id]
+
+        if kind == 'done':
+            stats.hashes += value
+            if self.template is not None and template_id == self.template.template_id:
+                self._send_job(worker_id)
+            return False
+
+        template = self.templates.get(template_id)
+        if template is None:
+            stats.stale_shares += 1
+            return False
+
+        digest = bytes.fromhex(template.search.hash_nonce(value))
+        if not meets_difficulty(digest, self.share_difficulty):
+            stats.invalid_shares += 1
+            return False
+
+        stats.shares += 1
+        stats.round_shares += 1
+
+        if template is self.template and meets_difficulty(digest, template.block.difficulty):
+            return self._submit(template, value, digest.hex())
+        return False
+
+    def _submit(self, template: BlockTemplate, nonce: int, block_hash: str) -> bool:
+        source = template.block
+        block = Block(source.index, source.transactions, source.previous_hash, timestamp=source.timestamp)
+        block.difficulty = source.difficulty
+        block.miner = self.pool_address
+        block.nonce = nonce
+        block.hash = block_hash
+        block.mining_duration = time.time() - self.round_started_at
+        share_work = 16 ** self.share_difficulty
+        block.mining_attempts = sum(stats.round_shares for stats in self.stats) * share_work
+
+        block_reward = self.blockchain.get_current_block_reward()
+        accepted, message = self.blockchain.submit_block(block)
+        if not accepted:
+            print(f"Пул: блок #{block.index} отклонен: {message}")
+            self.refresh_template(force=True)
+            return False
+
+        self.blocks_found += 1
+        print(f"Пул: найден блок #{block.index}, nonce {nonce}")
+        self.pay_workers(block_reward)
+        for stats in self.stats:
+            stats.round_shares = 0
+        self.round_started_at = time.time()
+        self.refresh_template(force=True)
+        return True
+
+    def reward_payouts(self) -> Dict[str, float]:
+        # Пропорциональная схема: награда делится по числу шаров за раунд
+        total = sum(stats.round_shares for stats in self.stats)
+        if total == 0:
+            return {self.pool_address: 1.0}
+        payouts: Dict[str, float] = {}
+        for stats in self.stats:
+            if stats.round_shares:
+                payouts[stats.address] = payouts.get(stats.address, 0.0) + stats.round_shares / total
+        return payouts
+
+    def pay_workers(self, block_reward: float) -> int:
+        transactions = []
+        for address, share in self.reward_payouts().items():
+            if address == self.pool_address:
+                continue
+            if address not in self.blockchain.wallets:
+                self.blockchain.create_wallet(address, 0.0)
+            transaction, message = self.blockchain.prepare_transfer(
+                self.pool_address, address, block_reward * share - self.payout_fee, self.payout_fee)
+            if transaction is None:
+                print(f"Пул: выплата {address} не подготовлена: {message}")
+                continue
+            transactions.append(transaction)
+        return sum(1 for admitted, _ in self.blockchain.add_transactions(transactions) if admitted)
+
+    def mine(self, blocks: int = 1, timeout: float = 60.0) -> int:
+        found = 0
+        deadline = time.time() + timeout
+        while found < blocks:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                message = self.results.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                continue
+            if self.handle_result(message):
+                found += 1
+        return found
+
+    def get_worker_stats(self) -> List[Dict[str, Any]]:
+        elapsed = time.time() - self.started_at if self.started_at else 0.0
+        share_work = 16 ** self.share_difficulty
+        return [stats.to_dict(share_work, elapsed) for stats in self.stats]
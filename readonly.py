@@ -0,0 +1,64 @@
+# readonly.py
+# Легкая точка входа для коротких скриптов: читает снимок состояния,
+# не импортируя blockchain.py и не строя объект Blockchain
+import json
+import sys
+from typing import Dict, Any
+
+SUPPORTED_SNAPSHOT_FORMAT = 1
+
+
+class ChainSnapshot:
+    def __init__(self, path: str):
+        self.path = path
+        self._data: Dict[str, Any] = None
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        if self._data is None:
+            with open(self.path, 'rb') as f:
+                data = json.loads(f.read())
+            if data.get('format', 0) > SUPPORTED_SNAPSHOT_FORMAT:
+                raise ValueError(f"Неподдерживаемый формат снимка: {data.get('format')}")
+            self._data = data
+        return self._data
+
+    def get_balance(self, wallet_name: str) -> float:
+        return self.data['wallets'].get(wallet_name, 0.0)
+
+    def get_tip(self) -> Dict[str, Any]:
+        data = self.data
+        return {
+            'height': data['height'],
+            'hash': data['hash'],
+            'timestamp': data.get('timestamp'),
+            'difficulty': data.get('difficulty'),
+            'block_reward': data.get('block_reward')
+        }
+
+    def get_chain_length(self) -> int:
+        return self.data['height'] + 1
+
+    def wallet_count(self) -> int:
+        return len(self.data['wallets'])
+
+
+def main(argv) -> int:
+    if len(argv) < 2 or argv[1] not in ('balance', 'tip'):
+        print("Использование: python readonly.py <снимок> balance <кошелек> | tip")
+        return 2
+
+    snapshot = ChainSnapshot(argv[0])
+    if argv[1] == 'balance':
+        if len(argv) < 3:
+            print("Укажите имя кошелька")
+            return 2
+        print(f"{argv[2]}: {snapshot.get_balance(argv[2])} BTC")
+    else:
+        tip = snapshot.get_tip()
+        print(f"Блок #{tip['height']}: {tip['hash']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
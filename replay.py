@@ -0,0 +1,89 @@
+# replay.py
+import hashlib
+import math
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Optional
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        for position in self._positions(key):
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+# Фильтры помнят последние max_generations * capacity id, память и время проверки ограничены.
+# Вместе с вытесненным поколением запоминается наибольшая метка времени его транзакций (horizon):
+# транзакции не новее этой метки всегда проверяются через exact_lookup, остальные - фильтрами.
+class SeenTransactionIndex:
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001,
+                 recent_window: int = 100_000, exact_lookup: Callable[..., bool] = None,
+                 max_generations: int = 4):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.recent_window = recent_window
+        self.max_generations = max_generations
+        # exact_lookup(transaction, before_height) - точная проверка по истории для срабатываний фильтра
+        self.exact_lookup = exact_lookup
+        self.filters: Deque[BloomFilter] = deque([BloomFilter(capacity, error_rate)])
+        self.newest: Deque[float] = deque([-math.inf])
+        self.horizon = -math.inf
+        self.recent: OrderedDict = OrderedDict()
+        self.exact_lookups = 0
+
+    def __len__(self) -> int:
+        return sum(bloom.count for bloom in self.filters)
+
+    def add(self, transaction_id: str, timestamp: Optional[float] = None):
+        bloom = self.filters[-1]
+        if bloom.count >= bloom.capacity:
+            # Новое поколение фильтра, чтобы доля ложных срабатываний не росла
+            bloom = BloomFilter(self.capacity, self.error_rate)
+            self.filters.append(bloom)
+            self.newest.append(-math.inf)
+            if len(self.filters) > self.max_generations:
+                self.filters.popleft()
+                self.horizon = max(self.horizon, self.newest.popleft())
+        bloom.add(transaction_id)
+        if timestamp is not None:
+            self.newest[-1] = max(self.newest[-1], timestamp)
+
+        self.recent[transaction_id] = None
+        if len(self.recent) > self.recent_window:
+            self.recent.popitem(last=False)
+
+    def might_contain(self, transaction_id: str) -> bool:
+        return any(transaction_id in bloom for bloom in self.filters)
+
+    def contains(self, transaction, before_height: Optional[int] = None) -> bool:
+        transaction_id = transaction.transaction_id
+        if transaction_id in self.recent:
+            return True
+        # За горизонтом вытесненных поколений фильтры уже ничего не гарантируют
+        if not self.might_contain(transaction_id) and transaction.timestamp > self.horizon:
+            return False
+        if self.exact_lookup is None:
+            return False
+        self.exact_lookups += 1
+        return self.exact_lookup(transaction, before_height)
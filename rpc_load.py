@@ -0,0 +1,141 @@
+# rpc_load.py
+# Генератор нагрузки для rpc_server.py: несколько keep-alive соединений,
+# на выходе - запросов в секунду и перцентили задержки.
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Dict, Any
+
+from rpc_server import RpcClient
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def make_payload(client: RpcClient, mode: str, rng: random.Random, wallets: int, batch_size: int):
+    def wallet() -> str:
+        return f"wallet_{rng.randrange(wallets)}"
+
+    if mode == 'balance':
+        return client.make_call('get_balance', [wallet()])
+    if mode == 'tip':
+        return client.make_call('get_latest_block')
+    if mode == 'transfer':
+        return client.make_call('transfer', [wallet(), wallet(), 0.001, 0.0001])
+    # batch: пакет переводов одним HTTP-запросом
+    return [client.make_call('transfer', [wallet(), wallet(), 0.001, 0.0001]) for _ in range(batch_size)]
+
+
+async def _worker(host: str, port: int, mode: str, deadline: float, latencies: List[float],
+                  errors: List[int], seed: int, wallets: int, batch_size: int):
+    rng = random.Random(seed)
+    client = RpcClient(host, port)
+    await client.connect()
+    try:
+        while time.perf_counter() < deadline:
+            payload = make_payload(client, mode, rng, wallets, batch_size)
+            start = time.perf_counter()
+            status, _ = await client.post(payload)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors[0] += 1
+    finally:
+        await client.close()
+
+
+async def run_load(host: str, port: int, mode: str = 'balance', connections: int = 8,
+                   duration: float = 5.0, wallets: int = 100, batch_size: int = 50) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = [0]
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _worker(host, port, mode, deadline, latencies, errors, seed, wallets, batch_size)
+        for seed in range(connections)
+    ])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    calls_per_request = batch_size if mode == 'batch' else 1
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed,
+        'calls_per_sec': len(latencies) * calls_per_request / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(port: int, wallets: int, mine_interval: float) -> subprocess.Popen:
+    directory = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen(
+        [sys.executable, "rpc_server.py", "--port", str(port), "--wallets", str(wallets),
+         "--mine-interval", str(mine_interval), "--quiet"],
+        cwd=directory, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Сервер не запустился")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест JSON-RPC сервера")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--spawn", action="store_true", help="Запустить сервер в отдельном процессе")
+    parser.add_argument("--mode", choices=('balance', 'tip', 'transfer', 'batch', 'all'), default='all')
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--wallets", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--mine-interval", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    process = None
+    port = args.port
+    if args.spawn:
+        port = _free_port()
+        process = spawn_server(port, args.wallets, args.mine_interval)
+
+    modes = ('balance', 'tip', 'transfer', 'batch') if args.mode == 'all' else (args.mode,)
+    try:
+        print(f"Нагрузка на {args.host}:{port}: {args.connections} соединений по {args.duration} сек")
+        print(f"  {'режим':<10}{'запросов':>10}{'ошибок':>8}{'RPS':>10}{'вызовов/с':>12}{'p50, мс':>10}{'p99, мс':>10}")
+        for mode in modes:
+            stats = asyncio.run(run_load(args.host, port, mode, args.connections, args.duration,
+                                         args.wallets, args.batch_size))
+            print(f"  {mode:<10}{stats['requests']:>10}{stats['errors']:>8}{stats['rps']:>10.0f}"
+                  f"{stats['calls_per_sec']:>12.0f}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
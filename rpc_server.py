@@ -0,0 +1,433 @@
+# rpc_server.py
+# Локальный HTTP/JSON-RPC 2.0 сервер поверх asyncio: соединения keep-alive,
+# пакетные вызовы и кеш чтений, который сбрасывается при появлении нового блока.
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+from typing import List, Dict, Any, Optional, Tuple
+
+from blockchain import Blockchain, Transaction
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+MAX_BODY_BYTES = 10_000_000
+HTTP_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+                405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _error(request_id, code: int, message: str) -> Dict[str, Any]:
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _result(request_id, result) -> Dict[str, Any]:
+    return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+
+class RpcServer:
+    # Вызовы, которые в пакете собираются в один проход Blockchain.add_transactions
+    BATCHED_METHODS = ('transfer', 'add_transaction')
+
+    def __init__(self, blockchain: Blockchain, host: str = "127.0.0.1", port: int = 8545,
+                 max_batch: int = 1000):
+        self.blockchain = blockchain
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.cache: Dict[Tuple, Any] = {}
+        self._cache_tip: Optional[str] = None
+        self.stats = {'connections': 0, 'requests': 0, 'calls': 0, 'batches': 0,
+                      'cache_hits': 0, 'cache_invalidations': 0}
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats['connections'] += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line or request_line in (b"\r\n", b"\n"):
+                    break
+
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._write_response(writer, 400, b"", keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get('connection', '').lower()
+                if version == "HTTP/1.0":
+                    keep_alive = connection == 'keep-alive'
+                else:
+                    keep_alive = connection != 'close'
+
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._write_response(writer, 400, b"", keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._write_response(writer, 413, b"", keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                self.stats['requests'] += 1
+                if method != "POST":
+                    status, payload = 405, b""
+                elif path not in ("/", "/rpc"):
+                    status, payload = 404, b""
+                else:
+                    payload = self.handle_payload(body)
+                    status = 200 if payload is not None else 204
+                await self._write_response(writer, status, payload or b"", keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionResetError:
+                pass
+
+    async def _write_response(self, writer: asyncio.StreamWriter, status: int, payload: bytes,
+                              keep_alive: bool):
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + payload)
+        await writer.drain()
+
+    def handle_payload(self, body: bytes) -> Optional[bytes]:
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return json.dumps(_error(None, PARSE_ERROR, "Некорректный JSON")).encode()
+
+        if isinstance(request, list):
+            if not request:
+                return json.dumps(_error(None, INVALID_REQUEST, "Пустой пакет")).encode()
+            if len(request) > self.max_batch:
+                return json.dumps(_error(None, INVALID_REQUEST,
+                                         f"Пакет больше {self.max_batch} вызовов")).encode()
+            responses = self.handle_batch(request)
+            return json.dumps(responses).encode() if responses else None
+
+        responses = self.handle_batch([request])
+        return json.dumps(responses[0]).encode() if responses else None
+
+    def handle_batch(self, calls: List[Any]) -> List[Dict[str, Any]]:
+        self.stats['calls'] += len(calls)
+        if len(calls) > 1:
+            self.stats['batches'] += 1
+
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+        pending: List[Tuple[int, Transaction]] = []
+        # Списания уже собранных в пакете транзакций - чтобы пакет не потратил баланс дважды
+        reserved: Dict[str, float] = {}
+        notifications = set()
+
+        for i, call in enumerate(calls):
+            if not isinstance(call, dict) or call.get('jsonrpc') != '2.0' or \
+                    not isinstance(call.get('method'), str):
+                responses[i] = _error(call.get('id') if isinstance(call, dict) else None,
+                                      INVALID_REQUEST, "Некорректный запрос JSON-RPC")
+                continue
+
+            if 'id' not in call:
+                notifications.add(i)
+            method = call['method']
+            params = call.get('params', [])
+            try:
+                if method in self.BATCHED_METHODS:
+                    transaction = self._build_transaction(method, params, reserved)
+                    pending.append((i, transaction))
+                    reserved[transaction.sender] = reserved.get(transaction.sender, 0.0) + \
+                        transaction.amount + transaction.fee
+                else:
+                    responses[i] = _result(call.get('id'), self.call(method, params))
+            except RpcError as e:
+                responses[i] = _error(call.get('id'), e.code, e.message)
+            except Exception as e:
+                responses[i] = _error(call.get('id'), INTERNAL_ERROR, str(e))
+
+        if pending:
+            # Все записи пакета проходят одним вызовом пакетного пути блокчейна
+            try:
+                results = self.blockchain.add_transactions([transaction for _, transaction in pending])
+            except Exception as e:
+                # Сбой пакетного пути не должен ронять остальные вызовы и соединение
+                for i, _ in pending:
+                    responses[i] = _error(calls[i].get('id'), INTERNAL_ERROR, str(e))
+                results = []
+            for (i, transaction), (admitted, message) in zip(pending, results):
+                responses[i] = _result(calls[i].get('id'), {
+                    'accepted': admitted,
+                    'transaction_id': transaction.transaction_id,
+                    'message': message
+                })
+
+        # Уведомления (вызовы без id) не получают ответа
+        return [response for i, response in enumerate(responses) if i not in notifications]
+
+    def call(self, method: str, params) -> Any:
+        if method in self.BATCHED_METHODS:
+            transaction = self._build_transaction(method, params)
+            admitted, message = self.blockchain.add_transactions([transaction])[0]
+            return {'accepted': admitted, 'transaction_id': transaction.transaction_id, 'message': message}
+
+        if method == 'get_balance':
+            wallet, = self._params(params, ('wallet',))
+            return self._cached(('get_balance', wallet), lambda: self.blockchain.get_balance(wallet))
+
+        if method == 'get_latest_block':
+            self._params(params, ())
+            return self._cached(('get_latest_block',), lambda: self.blockchain.get_latest_block().to_dict())
+
+        if method == 'is_chain_valid':
+            self._params(params, ())
+
+            def validate():
+                is_valid, errors = self.blockchain.is_chain_valid()
+                return {'valid': is_valid, 'errors': errors}
+            return self._cached(('is_chain_valid',), validate)
+
+        raise RpcError(METHOD_NOT_FOUND, f"Метод не найден: {method}")
+
+    def _build_transaction(self, method: str, params, reserved: Dict[str, float] = None) -> Transaction:
+        transaction = self._parse_transaction(method, params)
+        is_spendable, message = self.blockchain.check_spendable(
+            transaction, (reserved or {}).get(transaction.sender, 0.0))
+        if not is_spendable:
+            raise RpcError(INVALID_PARAMS, message)
+        return transaction
+
+    def _parse_transaction(self, method: str, params) -> Transaction:
+        if method == 'transfer':
+            from_wallet, to_wallet, amount, fee = self._params(
+                params, ('from_wallet', 'to_wallet', 'amount', 'fee'), defaults={'fee': 0.1})
+            if not isinstance(from_wallet, str) or not isinstance(to_wallet, str):
+                raise RpcError(INVALID_PARAMS, "Кошельки должны быть строками")
+            if not _is_number(amount) or not _is_number(fee):
+                raise RpcError(INVALID_PARAMS, "Сумма и комиссия должны быть числами")
+            transaction, message = self.blockchain.prepare_transfer(from_wallet, to_wallet, amount, fee)
+            if transaction is None:
+                raise RpcError(INVALID_PARAMS, message)
+            return transaction
+
+        data, = self._params(params, ('transaction',))
+        if not isinstance(data, dict):
+            raise RpcError(INVALID_PARAMS, "Транзакция должна быть объектом")
+        for field in ('transaction_id', 'sender', 'receiver'):
+            if not isinstance(data.get(field), str) or not data[field]:
+                raise RpcError(INVALID_PARAMS, f"Поле {field} должно быть непустой строкой")
+        # Награды создает только сам узел - извне монеты из "0" не принимаются
+        if data['sender'] == "0":
+            raise RpcError(INVALID_PARAMS, "Транзакции награды нельзя отправлять через RPC")
+        for field in ('amount', 'fee', 'timestamp'):
+            if not _is_number(data.get(field)):
+                raise RpcError(INVALID_PARAMS, f"Поле {field} должно быть числом")
+        if data.get('signature') is not None and not isinstance(data['signature'], str):
+            raise RpcError(INVALID_PARAMS, "Подпись должна быть строкой")
+        return Transaction.from_dict(data)
+
+    def _params(self, params, names: Tuple[str, ...], defaults: Dict[str, Any] = None) -> List[Any]:
+        defaults = defaults or {}
+        if isinstance(params, list):
+            if len(params) > len(names):
+                raise RpcError(INVALID_PARAMS, "Слишком много параметров")
+            values = dict(zip(names, params))
+        elif isinstance(params, dict):
+            unknown = set(params) - set(names)
+            if unknown:
+                raise RpcError(INVALID_PARAMS, f"Неизвестные параметры: {sorted(unknown)}")
+            values = params
+        else:
+            raise RpcError(INVALID_PARAMS, "Параметры должны быть списком или объектом")
+
+        result = []
+        for name in names:
+            if name in values:
+                result.append(values[name])
+            elif name in defaults:
+                result.append(defaults[name])
+            else:
+                raise RpcError(INVALID_PARAMS, f"Не указан параметр: {name}")
+        return result
+
+    def _cached(self, key: Tuple, compute) -> Any:
+        # Балансы и вершина меняются только с новым блоком - по его хешу и сбрасываем кеш
+        tip = self.blockchain.get_latest_block().hash
+        if tip != self._cache_tip:
+            if self.cache:
+                self.stats['cache_invalidations'] += 1
+            self.cache.clear()
+            self._cache_tip = tip
+        elif key in self.cache:
+            self.stats['cache_hits'] += 1
+            return self.cache[key]
+
+        value = self.cache[key] = compute()
+        return value
+
+
+class RpcClient:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8545):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._next_id = 0
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionResetError:
+                pass
+            self.writer = None
+
+    async def post(self, payload: Any) -> Tuple[int, Any]:
+        if self.writer is None:
+            await self.connect()
+        body = json.dumps(payload).encode()
+        self.writer.write((f"POST / HTTP/1.1\r\nHost: {self.host}\r\n"
+                           f"Content-Type: application/json\r\n"
+                           f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Сервер закрыл соединение")
+        status = int(status_line.split()[1])
+        length = 0
+        keep_alive = True
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            name = name.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'connection':
+                keep_alive = value.strip().lower() != 'close'
+        data = await self.reader.readexactly(length) if length else b""
+        if not keep_alive:
+            await self.close()
+        return status, json.loads(data) if data else None
+
+    def make_call(self, method: str, params=None, notify: bool = False) -> Dict[str, Any]:
+        call = {'jsonrpc': '2.0', 'method': method, 'params': params if params is not None else []}
+        if not notify:
+            self._next_id += 1
+            call['id'] = self._next_id
+        return call
+
+    async def call(self, method: str, *params) -> Any:
+        _, response = await self.post(self.make_call(method, list(params)))
+        if 'error' in response:
+            raise RpcError(response['error']['code'], response['error']['message'])
+        return response['result']
+
+    async def batch(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        _, responses = await self.post(calls)
+        return responses or []
+
+
+async def _mine_periodically(blockchain: Blockchain, interval: float, miner: str):
+    while True:
+        await asyncio.sleep(interval)
+        if blockchain.pending_transactions:
+            blockchain.mine_pending_transactions(miner, max_transactions=10_000)
+
+
+async def _run(args):
+    blockchain = Blockchain(difficulty=args.difficulty)
+    blockchain.create_wallets((f"wallet_{i}" for i in range(args.wallets)), args.balance)
+
+    server = RpcServer(blockchain, args.host, args.port)
+    await server.start()
+    print(f"JSON-RPC сервер слушает http://{server.host}:{server.port}/", flush=True)
+
+    if args.quiet:
+        # Сообщения блокчейна на каждую транзакцию заметно тормозят сервер под нагрузкой
+        sys.stdout = open(os.devnull, 'w')
+
+    tasks = []
+    if args.mine_interval > 0:
+        tasks.append(asyncio.create_task(_mine_periodically(blockchain, args.mine_interval, args.miner)))
+    try:
+        await server.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальный JSON-RPC сервер блокчейна")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--difficulty", type=int, default=1)
+    parser.add_argument("--wallets", type=int, default=100, help="Создать кошельки wallet_0..wallet_N-1")
+    parser.add_argument("--balance", type=float, default=1_000_000.0)
+    parser.add_argument("--mine-interval", type=float, default=0.0, help="Майнить пул каждые N секунд")
+    parser.add_argument("--miner", default="Miner1")
+    parser.add_argument("--quiet", action="store_true", help="Не печатать сообщения блокчейна")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(_run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# storage.py
+import dbm
+import json
+import os
+import zlib
+from typing import List, Dict, Any, Optional, Tuple
+
+
+class BlockBodyStore:
+    def __init__(self, directory: str, compression_level: int = 6):
+        self.directory = directory
+        self.compression_level = compression_level
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, "bodies.dat")
+        self.index_path = os.path.join(directory, "bodies.idx")
+        self.index: Dict[int, Tuple[int, int]] = {}
+        self.loads = 0
+        # id транзакции -> (высота, позиция) для архивных тел: точная проверка повторов без памяти под всю историю
+        self.transactions = dbm.open(os.path.join(directory, "transactions"), 'c')
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                for line in f:
+                    height, offset, length = map(int, line.split())
+                    self.index[height] = (offset, length)
+
+    def __contains__(self, height: int) -> bool:
+        return height in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def store(self, height: int, transactions: List[Dict[str, Any]]):
+        payload = zlib.compress(json.dumps(transactions).encode(), self.compression_level)
+
+        with open(self.data_path, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Индекс дописывается только после данных - оборванная запись не попадет в индекс
+        with open(self.index_path, 'a') as f:
+            f.write(f"{height} {offset} {len(payload)}\n")
+
+        self.index[height] = (offset, len(payload))
+
+        for position, transaction in enumerate(transactions):
+            key = transaction['transaction_id'].encode()
+            if key not in self.transactions:
+                self.transactions[key] = f"{height} {position}".encode()
+        sync = getattr(self.transactions, 'sync', None)
+        if sync is not None:
+            sync()
+
+    def locate(self, transaction_id: str) -> Optional[Tuple[int, int]]:
+        value = self.transactions.get(transaction_id.encode())
+        if value is None:
+            return None
+        height, position = map(int, value.split())
+        return height, position
+
+    def load(self, height: int) -> List[Dict[str, Any]]:
+        offset, length = self.index[height]
+        with open(self.data_path, 'rb') as f:
+            f.seek(offset)
+            payload = f.read(length)
+        self.loads += 1
+        return json.loads(zlib.decompress(payload))
+
+    def close(self):
+        self.transactions.close()
+
+    def size_on_disk(self) -> int:
+        return os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
@@ -0,0 +1,83 @@
+# test_analytics.py
+from blockchain import Blockchain, CounterClock, CounterIdFactory
+from analytics import TransactionTable
+
+
+def test_incremental_update():
+    print("=== ТЕСТ 1: Инкрементальное обновление таблицы ===")
+
+    blockchain = Blockchain(difficulty=1, clock=CounterClock(1000.0), id_factory=CounterIdFactory())
+    blockchain.create_wallet("Alice", 100.0)
+    blockchain.create_wallet("Bob", 100.0)
+    for i in range(2):
+        blockchain.transfer("Alice", "Bob", 10.0, fee=0.1)
+        blockchain.mine_pending_transactions("Miner1")
+    table = TransactionTable(capacity=2)
+    added = table.update(blockchain)
+    rows = sum(len(block.transactions) for block in blockchain.chain)
+    print(f"Блоков добавлено: {added}, строк: {len(table)}")
+    assert added == blockchain.get_chain_length()
+    assert len(table) == rows
+
+    blockchain.transfer("Bob", "Alice", 3.0, fee=0.4)
+    blockchain.mine_pending_transactions("Miner1")
+    assert table.update(blockchain) == 1
+    assert len(table) == rows + len(blockchain.get_latest_block().transactions)
+    assert table.update(blockchain) == 0
+    print()
+
+
+def test_aggregate_queries():
+    print("=== ТЕСТ 2: Агрегирующие запросы ===")
+
+    blockchain = Blockchain(difficulty=1, clock=CounterClock(1000.0, step=600.0), id_factory=CounterIdFactory())
+    for name in ("Alice", "Bob", "Charlie"):
+        blockchain.create_wallet(name, 100.0)
+    blockchain.transfer("Alice", "Bob", 10.0, fee=0.1)
+    blockchain.transfer("Alice", "Charlie", 5.0, fee=0.3)
+    blockchain.transfer("Bob", "Charlie", 2.0, fee=0.2)
+    blockchain.mine_pending_transactions("Miner1")
+    blockchain.transfer("Charlie", "Alice", 1.0, fee=0.5)
+    blockchain.mine_pending_transactions("Miner2")
+    table = TransactionTable()
+    table.update(blockchain)
+
+    heights, percentiles = table.fee_percentiles_per_block((0, 50, 100))
+    print(f"Перцентили комиссий по блокам: {dict(zip(heights.tolist(), percentiles.tolist()))}")
+    assert heights.tolist() == [1, 2]
+    assert percentiles[0].tolist() == [0.1, 0.2, 0.3]
+    assert percentiles[1].tolist() == [0.5, 0.5, 0.5]
+
+    top = table.top_senders(2)
+    print(f"Крупнейшие отправители: {top}")
+    assert top == [("Alice", 15.0), ("Bob", 2.0)]
+    assert table.top_senders(1, by='count') == [("Alice", 2.0)]
+
+    shares = table.miner_revenue_share()
+    print(f"Доли дохода майнеров: {shares}")
+    assert set(shares) == {"Miner1", "Miner2"}
+    assert abs(sum(shares.values()) - 1.0) < 1e-9
+    assert shares["Miner1"] > shares["Miner2"]
+
+    hours, volume, counts = table.volume_per_hour()
+    assert abs(volume.sum() - 18.0) < 1e-9
+    assert counts.sum() == 4
+
+    groups, max_fee = table.group_by('receiver', 'fee', agg='max', mask=table.transfers_mask())
+    by_name = {table.names[i]: fee for i, fee in zip(groups.tolist(), max_fee.tolist())}
+    assert by_name == {"Alice": 0.5, "Bob": 0.1, "Charlie": 0.3}
+    print()
+
+
+def run_all_analytics_tests():
+    """Запуск всех тестов аналитики"""
+    print("🧪 ТЕСТИРОВАНИЕ АНАЛИТИКИ 🧪\n")
+
+    test_incremental_update()
+    test_aggregate_queries()
+
+    print("🎉 ТЕСТЫ АНАЛИТИКИ ЗАВЕРШЕНЫ! 🎉")
+
+
+if __name__ == "__main__":
+    run_all_analytics_tests()
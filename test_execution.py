@@ -0,0 +1,127 @@
+# test_execution.py
+import os
+import random
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from blockchain import Block, Transaction
+from execution import BlockExecutor, apply_block_serial
+from wallets import WalletRegistry
+
+
+def make_block(transfers, miner="Miner1"):
+    transactions = []
+    for i, (sender, receiver, amount, fee) in enumerate(transfers):
+        tx = Transaction(sender, receiver, amount, timestamp=1000.0 + i, transaction_id=f"tx-{i}")
+        tx.fee = fee
+        tx.sign_transaction()
+        transactions.append(tx)
+    block = Block(1, transactions, "prev_hash", timestamp=2000.0)
+    block.miner = miner
+    return block
+
+
+def make_registry(names, shards=1):
+    registry = WalletRegistry(num_shards=shards)
+    for i, name in enumerate(names):
+        registry[name] = 100.0 + i * 0.37
+    return registry
+
+
+def random_transfers(rng, wallets, count):
+    transfers = []
+    for _ in range(count):
+        sender = rng.choice(wallets + ["0"])
+        receiver = rng.choice(wallets + ["newcomer"])
+        transfers.append((sender, receiver, round(rng.uniform(0.01, 5.0), 8), round(rng.uniform(0.0, 0.3), 8)))
+    return transfers
+
+
+def test_partition_has_no_conflicts():
+    print("=== ТЕСТ 1: Разбиение блока на непересекающиеся группы ===")
+
+    names = [f"user_{i}" for i in range(50)]
+    registry = make_registry(names)
+    block = make_block(random_transfers(random.Random(1), names, 300))
+
+    groups = BlockExecutor().partition(registry, block.transactions)
+    print(f"Транзакций: {len(block.transactions)}, групп: {len(groups)}")
+
+    seen_positions = []
+    for group in groups:
+        touched = set()
+        for position in group:
+            tx = block.transactions[position]
+            accounts = {tx.receiver} | ({tx.sender} if tx.sender != "0" else set())
+            assert not (accounts & touched)
+            touched |= accounts
+        seen_positions.extend(group)
+    assert sorted(seen_positions) == list(range(len(block.transactions)))
+    print()
+
+
+def test_grouped_matches_serial():
+    print("=== ТЕСТ 2: Групповое применение совпадает с последовательным ===")
+
+    names = [f"user_{i}" for i in range(2000)]
+    rng = random.Random(7)
+    for shards in (1, 4):
+        block = make_block(random_transfers(rng, names, 1500) + [("user_1", "user_1", 1.0, 0.1)])
+
+        serial = make_registry(names, shards)
+        apply_block_serial(serial, block, 50.0)
+
+        grouped = make_registry(names, shards)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            executor = BlockExecutor(executor=pool, max_group_ratio=1.0)
+            executor.execute(grouped, block, 50.0)
+
+        print(f"Шардов: {shards}, режим: {executor.last_mode}, групп: {executor.last_group_count}")
+        assert executor.last_mode == 'grouped'
+        assert list(grouped) == list(serial)
+        assert dict(grouped) == dict(serial)
+
+        # Без executor группировка не окупается - по умолчанию блок применяется по порядку
+        default = BlockExecutor()
+        default.execute(make_registry(names, shards), block, 50.0)
+        assert default.last_mode == 'serial'
+    print()
+
+
+def test_conflict_fallback():
+    print("=== ТЕСТ 3: Откат к последовательному применению при конфликтах ===")
+
+    names = ["Alice", "Bob"]
+    block = make_block([("Alice", "Bob", 0.5, 0.01)] * 100)
+    registry = make_registry(names)
+    executor = BlockExecutor()
+    executor.execute(registry, block, 50.0)
+
+    expected = make_registry(names)
+    apply_block_serial(expected, block, 50.0)
+    print(f"Режим: {executor.last_mode}")
+    assert executor.last_mode == 'serial'
+    assert dict(registry) == dict(expected)
+
+    # NumPy подгружается только векторными путями, а не при импорте блокчейна
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, blockchain; blockchain.Blockchain(); print('numpy' in sys.modules)"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    print(f"NumPy загружен при старте: {result.stdout.strip()}")
+    assert result.stdout.strip() == "False"
+    print()
+
+
+def run_all_execution_tests():
+    """Запуск всех тестов исполнения блоков"""
+    print("🧪 ТЕСТИРОВАНИЕ ИСПОЛНЕНИЯ БЛОКОВ 🧪\n")
+
+    test_partition_has_no_conflicts()
+    test_grouped_matches_serial()
+    test_conflict_fallback()
+
+    print("🎉 ТЕСТЫ ИСПОЛНЕНИЯ БЛОКОВ ЗАВЕРШЕНЫ! 🎉")
+
+
+if __name__ == "__main__":
+    run_all_execution_tests()
@@ -0,0 +1,223 @@
+# test_mempool.py
+from blockchain import Blockchain, Transaction, CounterClock, CounterIdFactory
+from mempool import Mempool
+
+# Идентификаторы одинаковой длины, чтобы размеры транзакций были предсказуемы
+transaction_ids = CounterIdFactory("test", start=100_000)
+
+
+def make_transaction(sender: str, receiver: str, amount: float, fee: float, memo_length: int = 0) -> Transaction:
+    # Длина имени получателя меняет сериализованный размер транзакции
+    tx = Transaction(sender, receiver + "x" * memo_length, amount,
+                     timestamp=1000.0, transaction_id=transaction_ids())
+    tx.fee = fee
+    tx.sign_transaction()
+    return tx
+
+
+def test_size_tracking():
+    print("=== ТЕСТ 1: Учет размера транзакций в пуле ===")
+
+    mempool = Mempool()
+    small = make_transaction("Alice", "Bob", 1.0, 0.1)
+    large = make_transaction("Alice", "Bob", 1.0, 0.1, memo_length=200)
+    mempool.add(small)
+    mempool.add(large)
+
+    print(f"Размеры: {small.get_size()} и {large.get_size()} байт, всего {mempool.total_bytes}")
+    assert mempool.total_bytes == small.get_size() + large.get_size()
+    assert mempool.size_of([small, large]) == mempool.total_bytes
+    assert not mempool.add(small)
+
+    mempool.remove(small)
+    assert mempool.total_bytes == large.get_size()
+    assert small not in mempool and large in mempool
+    print()
+
+
+def test_feerate_selection():
+    print("=== ТЕСТ 2: Отбор по комиссии за байт в пределах размера блока ===")
+
+    mempool = Mempool()
+    bulky = make_transaction("Alice", "Bob", 1.0, 0.5, memo_length=2000)
+    compact = [make_transaction("Carol", "Dave", 1.0, 0.2) for _ in range(3)]
+    mempool.add(bulky)
+    for tx in compact:
+        mempool.add(tx)
+
+    budget = bulky.get_size()
+    selected = mempool.select(max_bytes=budget)
+    print(f"Бюджет {budget} байт, отобрано: {len(selected)}, комиссия: {sum(tx.fee for tx in selected):.2f}")
+    assert bulky not in selected
+    assert len(selected) == 3
+    assert sum(tx.get_size() for tx in selected) <= budget
+
+    assert mempool.select(max_count=2) == compact[:2]
+    assert len(mempool) == 4
+    print()
+
+
+def test_block_size_limit():
+    print("=== ТЕСТ 3: Лимит размера блока в цепи ===")
+
+    blockchain = Blockchain(difficulty=1, clock=CounterClock(1000.0), id_factory=CounterIdFactory(start=100))
+    blockchain.create_wallet("Alice", 100.0)
+    blockchain.create_wallet("Bob", 100.0)
+    for i in range(5):
+        blockchain.transfer("Alice", "Bob", 1.0, fee=0.1 * (i + 1))
+
+    one_tx = blockchain.pending_transactions.select(max_count=1)[0].get_size()
+    blockchain.max_block_bytes = 2 * one_tx + 10
+    blockchain.mine_pending_transactions("Miner1")
+
+    latest_block = blockchain.get_latest_block()
+    print(f"Транзакций в блоке: {len(latest_block.transactions)}, размер: {latest_block.get_size()} байт")
+    assert len(latest_block.transactions) == 2
+    assert [tx.fee for tx in latest_block.transactions] == [0.5, 0.4]
+    assert blockchain.is_chain_valid()[0]
+
+    blockchain.max_block_bytes = one_tx
+    is_valid, errors = blockchain.is_chain_valid()
+    print(f"Цепь валидна при уменьшенном лимите: {is_valid}")
+    assert not is_valid
+    print()
+
+
+def test_package_selection():
+    print("=== ТЕСТ 4: Отбор пакетов зависимых транзакций ===")
+
+    blockchain = Blockchain(difficulty=1)
+    blockchain.create_wallet("Alice", 100.0)
+    blockchain.create_wallet("Bob", 0.0)
+    blockchain.create_wallet("Carol", 100.0)
+
+    parent = make_transaction("Alice", "Bob", 20.0, 0.01)
+    child = make_transaction("Bob", "Carol", 10.0, 2.0)
+    other = make_transaction("Carol", "Alice", 1.0, 0.5)
+    for tx in (parent, child, other):
+        blockchain.add_transaction(tx)
+
+    entry = blockchain.pending_transactions.entries[child.transaction_id]
+    print(f"Родители Bob -> Carol: {len(entry.parents)}, оценка пакета: {entry.ancestor_score:.6f}")
+    assert entry.parents == {parent.transaction_id}
+
+    selected = blockchain.select_transactions_for_block(max_transactions=2)
+    assert selected == [parent, child]
+
+    selected = blockchain.select_transactions_for_block(max_transactions=1)
+    assert selected == [other]
+
+    blockchain.mine_pending_transactions("Miner1", max_transactions=3)
+    print(f"Баланс Bob после блока: {blockchain.get_balance('Bob')} BTC")
+    assert blockchain.get_latest_block().transactions[:2] == [parent, child]
+    assert blockchain.get_balance("Bob") >= 0
+    print()
+
+
+def test_ancestor_score_updates():
+    print("=== ТЕСТ 5: Инкрементальное обновление оценки предков ===")
+
+    balances = {"Alice": 100.0}
+    mempool = Mempool(balance_of=lambda name: balances.get(name, 0.0))
+    parent = make_transaction("Alice", "Bob", 20.0, 0.1)
+    child = make_transaction("Bob", "Carol", 10.0, 0.3)
+    grandchild = make_transaction("Carol", "Dave", 5.0, 0.6)
+    for tx in (parent, child, grandchild):
+        mempool.add(tx)
+
+    entry = mempool.entries[grandchild.transaction_id]
+    assert entry.ancestors == {parent.transaction_id, child.transaction_id}
+    assert abs(entry.ancestor_fee - 1.0) < 1e-9
+
+    balances["Bob"] = 20.0
+    mempool.remove(parent)
+    print(f"Предков после подтверждения родителя: {len(entry.ancestors)}")
+    assert entry.ancestors == {child.transaction_id}
+    assert abs(entry.ancestor_fee - 0.9) < 1e-9
+    assert mempool.select() == [child, grandchild]
+    print()
+
+
+def test_eviction_and_expiry():
+    print("=== ТЕСТ 6: Вытеснение, устаревание и динамическая минимальная комиссия ===")
+
+    mempool = Mempool(max_transactions=3)
+    cheap = make_transaction("Alice", "Bob", 1.0, 0.01)
+    for tx in [cheap] + [make_transaction("Alice", "Bob", 1.0, 0.5) for _ in range(2)]:
+        assert mempool.add(tx)
+
+    expensive = make_transaction("Carol", "Dave", 1.0, 0.9)
+    assert mempool.add(expensive)
+    print(f"Дешевая транзакция вытеснена: {cheap not in mempool}")
+    assert cheap not in mempool and len(mempool) == 3
+
+    admitted, message = mempool.admit(make_transaction("Carol", "Dave", 1.0, 0.001))
+    print(f"Транзакция с низкой комиссией: {message}")
+    assert not admitted
+    assert mempool.get_stats()['evicted']['pool_full'] == 1
+    assert mempool.get_stats()['rejected']['pool_full'] == 1
+
+    surge = Mempool(max_transactions=4, min_feerate=0.0001)
+    base = surge.current_min_feerate()
+    for _ in range(4):
+        surge.add(make_transaction("Alice", "Bob", 1.0, 1.0))
+    print(f"Минимальная ставка: {base} -> {surge.current_min_feerate()}")
+    assert surge.current_min_feerate() == base * 10
+
+    now = [1000.0]
+    aging = Mempool(expiry_seconds=60, clock=lambda: now[0])
+    old = make_transaction("Alice", "Bob", 1.0, 0.1)
+    aging.add(old)
+    now[0] = 1100.0
+    fresh = Transaction("Carol", "Dave", 1.0, timestamp=1100.0, transaction_id=transaction_ids())
+    fresh.sign_transaction()
+    aging.add(fresh)
+    print(f"Устаревших удалено: {aging.eviction_counts['expired']}")
+    assert old not in aging and fresh in aging
+
+    # Срок считается по часам пула, а не по метке входящей транзакции
+    future = Transaction("Erin", "Frank", 1.0, timestamp=1e12, transaction_id=transaction_ids())
+    future.sign_transaction()
+    assert aging.add(future)
+    assert fresh in aging and aging.eviction_counts['expired'] == 1
+
+    stale = Transaction("Erin", "Frank", 1.0, timestamp=0.0, transaction_id=transaction_ids())
+    stale.sign_transaction()
+    admitted, message = aging.admit(stale)
+    print(f"Просроченная транзакция: {message}")
+    assert not admitted and aging.rejection_counts['expired'] == 1
+
+    payout = Transaction("0", "Miner1", 50.0, timestamp=1100.0, transaction_id=transaction_ids())
+    payout.sign_transaction()
+    assert aging.add(payout)
+
+    assert aging.oldest_timestamp() == 1100.0
+
+    now[0] = 2000.0
+    assert aging.expire() == 1 and fresh not in aging
+    assert aging.oldest_timestamp() == 1e12
+    print(f"Выплата награды осталась в пуле: {payout in aging}")
+    assert payout in aging
+
+    full = Mempool(max_transactions=1)
+    assert full.add(payout) and not full.add(make_transaction("Alice", "Bob", 1.0, 0.5))
+    assert payout in full and len(full) == 1
+    print()
+
+
+def run_all_mempool_tests():
+    """Запуск всех тестов пула транзакций"""
+    print("🧪 ТЕСТИРОВАНИЕ ПУЛА ТРАНЗАКЦИЙ 🧪\n")
+
+    test_size_tracking()
+    test_feerate_selection()
+    test_block_size_limit()
+    test_package_selection()
+    test_ancestor_score_updates()
+    test_eviction_and_expiry()
+
+    print("🎉 ТЕСТЫ ПУЛА ТРАНЗАКЦИЙ ЗАВЕРШЕНЫ! 🎉")
+
+
+if __name__ == "__main__":
+    run_all_mempool_tests()
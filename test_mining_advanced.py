@@ -1,6 +1,8 @@
 # test_mining_advanced.py
 import time
-from blockchain import Blockchain, Transaction
+from blockchain import Blockchain, Block, Transaction
+from hashing import NonceSearch
+from metrics import Metrics
 
 
 def test_mining_reward_system():
@@ -145,6 +147,81 @@ def test_network_statistics():
     print()
 
 
+def test_performance_metrics():
+    print("=== ТЕСТ 6: Метрики производительности ===")
+
+    blockchain = Blockchain(difficulty=2, metrics=Metrics(enabled=True))
+    blockchain.create_wallet("Miner1", 0.0)
+    blockchain.create_wallet("Alice", 100.0)
+    blockchain.create_wallet("Bob", 50.0)
+
+    blockchain.transfer("Alice", "Bob", 10.0, fee=0.2)
+    blockchain.transfer("Bob", "Alice", 5.0, fee=0.1)
+    blockchain.mine_pending_transactions("Miner1")
+    blockchain.is_chain_valid()
+
+    snapshot = blockchain.get_metrics()
+    print(f"Блоков замайнено: {snapshot['counters']['blocks_mined_total']}")
+    print(f"Попыток майнинга: {snapshot['counters']['mining_attempts_total']}")
+    print(f"Таймеры: {sorted(snapshot['histograms'])}")
+    assert snapshot['counters']['blocks_mined_total'] == 1
+    for name in ('mine_block_seconds', 'select_transactions_seconds',
+                 'update_balances_seconds', 'chain_validation_seconds'):
+        assert name in snapshot['histograms']
+    assert 'mempool_oldest_age_seconds' in snapshot['gauges']
+
+    # Возрасты пула - снимок на момент выгрузки, повторная выгрузка не удваивает наблюдения
+    pool_size = len(blockchain.pending_transactions)
+    assert snapshot['histograms']['mempool_age_seconds']['count'] == pool_size
+    assert blockchain.get_metrics()['histograms']['mempool_age_seconds']['count'] == pool_size
+
+    # Попытки майнинга раскладываются по своим корзинам, а не попадают все в верхнюю секундную
+    attempts = snapshot['histograms']['mining_attempts']
+    assert max(attempts['buckets']) > 3600.0
+    assert sum(attempts['buckets'].values()) == attempts['count'] == 1
+
+    text = blockchain.export_metrics()
+    print(text.splitlines()[0])
+    assert "blockchain_blocks_mined_total 1.0" in text
+
+    disabled = Blockchain(difficulty=1)
+    disabled.create_wallet("Alice", 100.0)
+    disabled.transfer("Alice", "Bob", 1.0)
+    disabled.mine_pending_transactions("Miner1")
+    assert disabled.get_metrics() == {'counters': {}, 'gauges': {}, 'histograms': {}}
+    print()
+
+
+def test_mining_backends():
+    print("=== ТЕСТ 7: Бэкенды перебора nonce ===")
+
+    results = {}
+    for backend in ("python", "batch"):
+        tx = Transaction("Alice", "Bob", 10.0, timestamp=1000.0, transaction_id="tx-fixed")
+        tx.sign_transaction()
+        block = Block(1, [tx], "prev_hash", timestamp=2000.0)
+        block.mine_block(3, "Miner1", backend=backend)
+        results[backend] = block
+        print(f"  {backend}: nonce {block.nonce}, хеш {block.hash[:16]}...")
+
+    assert results["python"].nonce == results["batch"].nonce
+    assert results["batch"].hash == results["batch"].calculate_hash()
+    assert results["batch"].verify_integrity()[0]
+
+    search = NonceSearch(results["batch"])
+    assert search.hash_nonce(results["batch"].nonce) == results["batch"].hash
+    assert search.search(0, results["batch"].nonce + 1, 3) == results["batch"].nonce
+
+    # Строка-маркер nonce в полях транзакции не должна ломать разбиение заголовка
+    tricky = Transaction("Alice", "__nonce_placeholder__", 1.0, timestamp=1000.0, transaction_id="tx-marker")
+    tricky.sign_transaction()
+    block = Block(2, [tricky], "prev_hash", timestamp=2000.0)
+    block.mine_block(2, "Miner1", backend="batch")
+    print(f"  Блок с маркером в получателе: nonce {block.nonce}")
+    assert block.hash == block.calculate_hash()
+    print()
+
+
 def run_all_mining_tests():
     """Запуск всех тестов майнинга"""
     print("🧪 ТЕСТИРОВАНИЕ УЛУЧШЕННОЙ СИСТЕМЫ МАЙНИНГА 🧪\n")
@@ -154,6 +231,8 @@ def run_all_mining_tests():
     test_transaction_selection()
     test_wallet_system()
     test_network_statistics()
+    test_performance_metrics()
+    test_mining_backends()
 
     print("🎉 ТЕСТЫ МАЙНИНГА ЗАВЕРШЕНЫ! 🎉")
 
@@ -0,0 +1,126 @@
+# test_pool.py
+import io
+import time
+from blockchain import Blockchain, CounterClock, CounterIdFactory
+from pool import MiningPool
+
+
+def make_blockchain(difficulty: int = 3) -> Blockchain:
+    blockchain = Blockchain(difficulty=difficulty, clock=CounterClock(1000.0), id_factory=CounterIdFactory())
+    blockchain.create_wallet("Alice", 100.0)
+    blockchain.create_wallet("Bob", 100.0)
+    blockchain.transfer("Alice", "Bob", 10.0, fee=0.1)
+    return blockchain
+
+
+def mine_round_robin(pool: MiningPool, blocks: int, min_shares: int) -> int:
+    # Шары воркеров подаются координатору по очереди из фиксированных диапазонов nonce,
+    # без процессов - результат не зависит от планировщика
+    pool.refresh_template(force=True, dispatch=False)
+    pool.started_at = pool.round_started_at = time.time()
+    ranges, template = [], None
+    found = 0
+    while found < blocks or min(stats.shares for stats in pool.stats) < min_shares:
+        if pool.template is not template:
+            template = pool.template
+            ranges = [list(template.take_range(pool.nonce_range)) for _ in pool.stats]
+        for worker_id, nonce_range in enumerate(ranges):
+            start, count = nonce_range
+            nonce = template.search.search(start, count, pool.share_difficulty)
+            assert nonce is not None, "Диапазон nonce исчерпан"
+            nonce_range[0], nonce_range[1] = nonce + 1, start + count - nonce - 1
+            if pool.handle_result(('share', worker_id, template.template_id, nonce)):
+                found += 1
+                break
+    return found
+
+
+def test_pool_mining():
+    print("=== ТЕСТ 1: Совместный майнинг и пропорциональные награды ===")
+
+    blockchain = make_blockchain()
+    pool = MiningPool(blockchain, ["worker_a", "worker_b"], share_difficulty=1, nonce_range=50_000)
+    found = mine_round_robin(pool, blocks=2, min_shares=3)
+    stats = pool.get_worker_stats()
+
+    print(f"Найдено блоков: {found}, длина цепи: {blockchain.get_chain_length()}")
+    assert found == 2
+    assert blockchain.get_chain_length() == 3
+    assert blockchain.get_latest_block().miner == "Pool"
+    assert blockchain.is_chain_valid()[0]
+
+    for worker in stats:
+        print(f"  {worker['address']}: шаров {worker['shares']}, хешрейт {worker['hash_rate']:.0f} H/s")
+        assert worker['shares'] >= 3 and worker['invalid_shares'] == 0
+        assert worker['hash_rate'] > 0
+
+    # Пул получает награду как майнер и переводит воркерам их доли со своего баланса
+    reward = blockchain.get_current_block_reward()
+    payouts = [tx for tx in blockchain.pending_transactions if tx.sender == "Pool"]
+    print(f"Выплаты: {[(tx.receiver, round(tx.amount, 4)) for tx in payouts]}")
+    assert {tx.receiver for tx in payouts} <= {"worker_a", "worker_b"}
+    assert abs(sum(tx.amount for tx in payouts) - reward) < 1e-9
+
+    paid = blockchain.get_balance("worker_a") + blockchain.get_balance("worker_b")
+    print(f"Воркерам выплачено за первый блок: {paid}")
+    assert abs(paid - reward) < 1e-9
+    print()
+
+
+def test_pool_import_roundtrip():
+    print("=== ТЕСТ 3: Балансы после импорта цепи, найденной пулом ===")
+
+    blockchain = make_blockchain()
+    with MiningPool(blockchain, ["worker_a", "worker_b"], share_difficulty=1, nonce_range=5_000) as pool:
+        assert pool.mine(blocks=2, timeout=60) == 2
+    blockchain.mine_pending_transactions("Miner1")
+
+    buffer = io.StringIO()
+    blockchain.export_ndjson(buffer)
+    buffer.seek(0)
+    imported = Blockchain(difficulty=blockchain.difficulty, id_factory=CounterIdFactory())
+    imported.create_wallet("Alice", 100.0)
+    imported.create_wallet("Bob", 100.0)
+    is_valid, errors = imported.import_ndjson(buffer)
+    assert is_valid, errors
+
+    print(f"Балансы: {dict(blockchain.wallets)}")
+    assert dict(imported.wallets) == dict(blockchain.wallets)
+    print()
+
+
+def test_template_refresh():
+    print("=== ТЕСТ 2: Обновление шаблона при новых транзакциях ===")
+
+    blockchain = make_blockchain()
+    pool = MiningPool(blockchain, ["worker_a"], max_transactions=1, min_fee_gain=0.05)
+    pool.refresh_template(force=True, dispatch=False)
+    first = pool.template
+
+    assert not pool.refresh_template(dispatch=False)
+
+    blockchain.transfer("Bob", "Alice", 1.0, fee=0.12)
+    print(f"Комиссия выше на 0.02 - шаблон остается: {pool.template is first}")
+    assert not pool.refresh_template(dispatch=False)
+
+    blockchain.transfer("Bob", "Alice", 2.0, fee=0.5)
+    assert pool.refresh_template(dispatch=False)
+    print(f"Шаблон #{pool.template.template_id}, комиссия {pool.template.total_fees} BTC")
+    assert pool.template.total_fees == 0.5
+    assert first.template_id in pool.templates
+    print()
+
+
+def run_all_pool_tests():
+    """Запуск всех тестов пула майнеров"""
+    print("🧪 ТЕСТИРОВАНИЕ ПУЛА МАЙНЕРОВ 🧪\n")
+
+    test_pool_mining()
+    test_template_refresh()
+    test_pool_import_roundtrip()
+
+    print("🎉 ТЕСТЫ ПУЛА МАЙНЕРОВ ЗАВЕРШЕНЫ! 🎉")
+
+
+if __name__ == "__main__":
+    run_all_pool_tests()
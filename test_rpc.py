@@ -0,0 +1,202 @@
+# test_rpc.py
+import asyncio
+from blockchain import Blockchain, CounterClock, CounterIdFactory
+from rpc_server import RpcServer, RpcClient, RpcError, METHOD_NOT_FOUND, INVALID_PARAMS
+
+
+def make_server() -> RpcServer:
+    blockchain = Blockchain(difficulty=1, clock=CounterClock(1000.0), id_factory=CounterIdFactory())
+    blockchain.create_wallet("Alice", 100.0)
+    blockchain.create_wallet("Bob", 100.0)
+    return RpcServer(blockchain, port=0)
+
+
+async def with_client(server: RpcServer, scenario):
+    await server.start()
+    client = RpcClient(server.host, server.port)
+    try:
+        return await scenario(client)
+    finally:
+        await client.close()
+        await server.close()
+
+
+def test_single_calls():
+    print("=== ТЕСТ 1: Одиночные вызовы и keep-alive ===")
+
+    server = make_server()
+
+    async def scenario(client: RpcClient):
+        assert await client.call('get_balance', "Alice") == 100.0
+        result = await client.call('transfer', "Alice", "Bob", 10.0, 0.1)
+        print(f"transfer: {result}")
+        assert result['accepted']
+
+        tip = await client.call('get_latest_block')
+        assert tip['hash'] == server.blockchain.get_latest_block().hash
+        assert (await client.call('is_chain_valid'))['valid']
+
+        for method, params, code in (('mine', [], METHOD_NOT_FOUND),
+                                     ('get_balance', [], INVALID_PARAMS),
+                                     ('transfer', ["Nobody", "Bob", 1.0], INVALID_PARAMS)):
+            try:
+                await client.call(method, *params)
+                assert False, f"{method} должен вернуть ошибку"
+            except RpcError as e:
+                print(f"{method}: {e.code} {e.message}")
+                assert e.code == code
+
+    asyncio.run(with_client(server, scenario))
+    print(f"Соединений: {server.stats['connections']}, запросов: {server.stats['requests']}")
+    assert server.stats['connections'] == 1
+    assert server.stats['requests'] == 7
+    print()
+
+
+def test_batch_calls():
+    print("=== ТЕСТ 2: Пакетные вызовы ===")
+
+    server = make_server()
+    blockchain = server.blockchain
+    signed = blockchain.create_transaction("Bob", "Alice", 3.0, fee=0.2)
+    signed.sign_transaction()
+
+    async def scenario(client: RpcClient):
+        calls = [
+            client.make_call('transfer', ["Alice", "Bob", 1.0, 0.1]),
+            client.make_call('get_balance', {'wallet': "Bob"}),
+            client.make_call('add_transaction', [signed.to_dict(include_signature=True)]),
+            client.make_call('transfer', ["Alice", "Bob", 2.0], notify=True),
+            {'jsonrpc': '2.0', 'id': 99},
+        ]
+        return await client.batch(calls)
+
+    admitted_batches = []
+    original = blockchain.add_transactions
+
+    def add_transactions(transactions):
+        admitted_batches.append(len(transactions))
+        return original(transactions)
+    blockchain.add_transactions = add_transactions
+
+    responses = asyncio.run(with_client(server, scenario))
+    for response in responses:
+        print(f"  {response}")
+    assert len(responses) == 4
+    assert responses[0]['result']['accepted']
+    assert responses[1]['result'] == 100.0
+    assert responses[2]['result']['transaction_id'] == signed.transaction_id
+    assert responses[3]['id'] == 99 and 'error' in responses[3]
+
+    print(f"Пакетов в add_transactions: {admitted_batches}, в пуле: {len(blockchain.pending_transactions)}")
+    assert admitted_batches == [3]
+    assert len(blockchain.pending_transactions) == 3
+    print()
+
+
+def test_read_cache_invalidation():
+    print("=== ТЕСТ 3: Кеш чтений сбрасывается новым блоком ===")
+
+    server = make_server()
+    blockchain = server.blockchain
+
+    async def scenario(client: RpcClient):
+        first = await client.call('get_balance', "Bob")
+        await client.call('get_balance', "Bob")
+        old_tip = await client.call('get_latest_block')
+        assert server.stats['cache_hits'] == 1
+
+        blockchain.transfer("Alice", "Bob", 5.0, fee=0.1)
+        blockchain.mine_pending_transactions("Miner1")
+
+        second = await client.call('get_balance', "Bob")
+        new_tip = await client.call('get_latest_block')
+        return first, second, old_tip, new_tip
+
+    first, second, old_tip, new_tip = asyncio.run(with_client(server, scenario))
+    print(f"Баланс Bob до блока: {first}, после: {second}")
+    assert second == first + 5.0
+    assert new_tip['index'] == old_tip['index'] + 1
+    assert server.stats['cache_invalidations'] == 1
+    print()
+
+
+def test_rejected_transactions():
+    print("=== ТЕСТ 4: Отклонение наград и некорректных полей ===")
+
+    server = make_server()
+    blockchain = server.blockchain
+    coinbase = blockchain.create_transaction("0", "Mallory", 1e9)
+    coinbase.sign_transaction()
+    broken = blockchain.create_transaction("Alice", "Bob", 1.0, fee=0.1)
+    broken.sign_transaction()
+    broken_data = broken.to_dict(include_signature=True)
+    broken_data['amount'] = "abc"
+
+    def signed(sender, receiver, amount, signature=None):
+        data = blockchain.create_transaction(sender, receiver, amount, fee=0.1).to_dict(include_signature=True)
+        data['signature'] = signature or f"signed_{data['transaction_id']}"
+        return data
+
+    async def scenario(client: RpcClient):
+        return await client.batch([
+            client.make_call('add_transaction', [coinbase.to_dict(include_signature=True)]),
+            client.make_call('add_transaction', [broken_data]),
+            client.make_call('get_balance', ["Alice"]),
+            client.make_call('add_transaction', [signed("Alice", "Nobody", 1e6, "signed_zz")]),
+            client.make_call('add_transaction', [signed("Alice", "Bob", 1e6)]),
+            client.make_call('add_transaction', [signed("Alice", "Alice", 1.0)]),
+            client.make_call('add_transaction', [signed("Alice", "Bob", 60.0)]),
+            client.make_call('add_transaction', [signed("Alice", "Bob", 60.0)]),
+        ])
+
+    responses = asyncio.run(with_client(server, scenario))
+    for response in responses:
+        print(f"  {response}")
+    assert len(responses) == 8
+    for i in (0, 1, 3, 4, 5, 7):
+        assert responses[i]['error']['code'] == INVALID_PARAMS
+    assert responses[2]['result'] == 100.0
+    # Второе списание 60 из 100 в том же пакете уже не покрыто балансом
+    assert responses[6]['result']['accepted']
+    assert len(blockchain.pending_transactions) == 1
+    print()
+
+
+def test_malformed_content_length():
+    print("=== ТЕСТ 5: Некорректный Content-Length ===")
+
+    server = make_server()
+
+    async def scenario(_client: RpcClient):
+        statuses = []
+        for value in ("abc", "-5"):
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            writer.write(f"POST / HTTP/1.1\r\nContent-Length: {value}\r\n\r\n".encode('latin-1'))
+            await writer.drain()
+            statuses.append(int((await reader.readline()).split()[1]))
+            writer.close()
+            await writer.wait_closed()
+        return statuses
+
+    statuses = asyncio.run(with_client(server, scenario))
+    print(f"Статусы ответов: {statuses}")
+    assert statuses == [400, 400]
+    print()
+
+
+def run_all_rpc_tests():
+    """Запуск всех тестов JSON-RPC сервера"""
+    print("🧪 ТЕСТИРОВАНИЕ JSON-RPC СЕРВЕРА 🧪\n")
+
+    test_single_calls()
+    test_batch_calls()
+    test_read_cache_invalidation()
+    test_rejected_transactions()
+    test_malformed_content_length()
+
+    print("🎉 ТЕСТЫ JSON-RPC СЕРВЕРА ЗАВЕРШЕНЫ! 🎉")
+
+
+if __name__ == "__main__":
+    run_all_rpc_tests()
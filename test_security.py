@@ -93,6 +93,108 @@ def test_chain_manipulation():
     print()
 
 
+def test_block_time_rules():
+    print("=== ТЕСТ 4: Правила времени блоков (медиана и дрейф в будущее) ===")
+    import random
+    from blockchain import CounterClock, MedianTimeWindow
+
+    window = MedianTimeWindow()
+    rng = random.Random(5)
+    values = [rng.uniform(0, 1000) for _ in range(30)]
+    for i, value in enumerate(values):
+        window.add(value)
+        recent = sorted(values[max(0, i - 10):i + 1])
+        assert window.median() == recent[len(recent) // 2]
+    print(f"Медиана последних 11 меток: {window.median():.2f}")
+
+    blockchain = Blockchain(difficulty=1, clock=CounterClock(1000.0))
+    blockchain.create_wallet("Alice", 1000.0)
+    blockchain.create_wallet("Bob", 0.0)
+    for i in range(12):
+        blockchain.transfer("Alice", "Bob", 1.0)
+        blockchain.mine_pending_transactions("Miner1")
+    assert blockchain.get_chain_length() == 13
+    assert blockchain.is_chain_valid()[0]
+
+    latest_block = blockchain.get_latest_block()
+    original_timestamp = latest_block.timestamp
+    latest_block.timestamp = blockchain.chain[3].timestamp
+    latest_block.nonce = 0
+    latest_block.mine_block(1, "Miner1")
+    is_valid, errors = blockchain.is_chain_valid()
+    print(f"Метка ниже медианы: {errors}")
+    assert not is_valid and "медианы" in errors[0]
+
+    latest_block.timestamp = original_timestamp + 10_000
+    latest_block.nonce = 0
+    latest_block.mine_block(1, "Miner1")
+    is_valid, errors = blockchain.is_chain_valid()
+    print(f"Метка в будущем: {errors}")
+    assert not is_valid and "будущем" in errors[0]
+
+    stuck = Blockchain(difficulty=1, clock=lambda: 500.0)
+    stuck.create_wallet("Alice", 100.0)
+    stuck.create_wallet("Bob", 0.0)
+    for i in range(3):
+        stuck.transfer("Alice", "Bob", 1.0)
+        stuck.mine_pending_transactions("Miner1")
+    print(f"Метки при остановившихся часах: {[block.timestamp for block in stuck.chain]}")
+    assert stuck.get_chain_length() == 4
+    assert stuck.is_chain_valid()[0]
+    print()
+
+
+def test_replay_protection():
+    print("=== ТЕСТ 5: Защита от повторного воспроизведения транзакций ===")
+    from replay import SeenTransactionIndex
+
+    blockchain = Blockchain(difficulty=1)
+    blockchain.create_wallet("Alice", 100.0)
+    blockchain.create_wallet("Bob", 0.0)
+
+    tx = Transaction("Alice", "Bob", 10.0)
+    tx.sign_transaction()
+    assert blockchain.add_transaction(tx)
+    assert not blockchain.add_transaction(tx)
+    blockchain.mine_pending_transactions("Miner1")
+
+    replayed = blockchain.add_transaction(tx)
+    print(f"Повтор подтвержденной транзакции принят: {replayed}")
+    assert not replayed
+
+    blockchain.transfer("Bob", "Alice", 1.0)
+    blockchain.mine_pending_transactions("Miner1")
+    assert blockchain.is_chain_valid()[0]
+
+    latest_block = blockchain.get_latest_block()
+    latest_block.transactions.append(tx)
+    latest_block.nonce = 0
+    latest_block.mine_block(1, "Miner1")
+    is_valid, errors = blockchain.is_chain_valid()
+    print(f"Ошибки при повторе в блоке: {errors}")
+    assert not is_valid and "повторная транзакция" in errors[0]
+
+    confirmed = {"id-1"}
+    index = SeenTransactionIndex(capacity=1000, recent_window=10, max_generations=3,
+                                 exact_lookup=lambda tx, height: tx.transaction_id in confirmed)
+    for i in range(5000):
+        index.add(f"id-{i}", float(i))
+    probe = Transaction("A", "B", 1.0, timestamp=4999.0, transaction_id="id-4999")
+    middle = Transaction("A", "B", 1.0, timestamp=3000.0, transaction_id="id-3000")
+    old = Transaction("A", "B", 1.0, timestamp=1.0, transaction_id="id-1")
+    fresh = Transaction("A", "B", 1.0, timestamp=6000.0, transaction_id="never-seen")
+    print(f"Поколений фильтра: {len(index.filters)}, горизонт: {index.horizon}, окно: {len(index.recent)}")
+    assert len(index.filters) == 3 and index.horizon == 1999.0
+    assert index.contains(probe)
+    assert index.might_contain("id-3000") and not index.contains(middle)
+    # Вытесненное поколение больше не в фильтрах, но старые метки проверяются точно
+    assert not index.might_contain("id-1") and index.contains(old)
+    lookups = index.exact_lookups
+    assert not index.contains(fresh) and index.exact_lookups == lookups
+    assert len(index.recent) == 10
+    print()
+
+
 def run_all_security_tests():
     """Запуск всех тестов безопасности"""
     print("🔒 ТЕСТИРОВАНИЕ СИСТЕМЫ БЕЗОПАСНОСТИ БЛОКЧЕЙНА 🔒\n")
@@ -100,6 +202,8 @@ def run_all_security_tests():
     test_comprehensive_security()
     test_transaction_validation()
     test_chain_manipulation()
+    test_block_time_rules()
+    test_replay_protection()
 
     print("🎉 ТЕСТЫ БЕЗОПАСНОСТИ ЗАВЕРШЕНЫ! 🎉")
 
@@ -0,0 +1,277 @@
+# test_storage.py
+import io
+from blockchain import Blockchain, CounterClock, CounterIdFactory, read_ndjson_blocks
+
+
+def build_blockchain(blocks: int = 3) -> Blockchain:
+    blockchain = Blockchain(difficulty=1, clock=CounterClock(1000.0), id_factory=CounterIdFactory())
+    blockchain.create_wallet("Alice", 100.0)
+    blockchain.create_wallet("Bob", 100.0)
+    for i in range(blocks):
+        blockchain.transfer("Alice", "Bob", float(i + 1), fee=0.1)
+        blockchain.transfer("Bob", "Alice", 0.5, fee=0.2)
+        blockchain.mine_pending_transactions("Miner1")
+    return blockchain
+
+
+def test_streaming_iterators():
+    print("=== ТЕСТ 1: Потоковые итераторы блоков и транзакций ===")
+
+    blockchain = build_blockchain()
+
+    heights = [block.index for block in blockchain.iter_blocks(1, 3)]
+    print(f"Блоки 1..3: {heights}")
+    assert heights == [1, 2]
+
+    from_alice = list(blockchain.iter_transactions(lambda tx: tx.sender == "Alice"))
+    for height, position, tx in from_alice:
+        print(f"  Блок #{height}[{position}]: {tx}")
+    assert len(from_alice) == 3
+    print()
+
+
+def test_ndjson_roundtrip():
+    print("=== ТЕСТ 2: Экспорт и импорт NDJSON ===")
+
+    blockchain = build_blockchain()
+
+    buffer = io.StringIO()
+    exported = blockchain.export_ndjson(buffer)
+    print(f"Экспортировано блоков: {exported}")
+    assert exported == blockchain.get_chain_length()
+
+    buffer.seek(0)
+    restored = list(read_ndjson_blocks(buffer))
+    assert [block.hash for block in restored] == [block.hash for block in blockchain.chain]
+    assert restored[1].transactions[0].signature == blockchain.chain[1].transactions[0].signature
+
+    buffer.seek(0)
+    is_valid, errors = blockchain.validate_blocks(read_ndjson_blocks(buffer))
+    print(f"Потоковая проверка валидна: {is_valid}")
+    assert is_valid, errors
+    print()
+
+
+def test_bulk_import():
+    print("=== ТЕСТ 3: Быстрый импорт без перемайнинга ===")
+
+    source = build_blockchain(blocks=5)
+    buffer = io.StringIO()
+    source.export_ndjson(buffer)
+
+    buffer.seek(0)
+    target = Blockchain(difficulty=1)
+    target.create_wallet("Alice", 100.0)
+    target.create_wallet("Bob", 100.0)
+    is_valid, errors = target.import_ndjson(buffer, batch_size=2)
+    print(f"Импорт успешен: {is_valid}, блоков: {target.get_chain_length()}")
+    assert is_valid, errors
+    assert target.get_latest_block().hash == source.get_latest_block().hash
+    for name in ("Alice", "Bob", "Miner1"):
+        assert abs(target.get_balance(name) - source.get_balance(name)) < 1e-9
+    assert target.is_chain_valid()[0]
+
+    buffer.seek(0)
+    blocks = list(read_ndjson_blocks(buffer))
+    blocks[3].transactions[0].amount = 999.0
+    tampered = Blockchain(difficulty=1)
+    is_valid, errors = tampered.bulk_import(blocks)
+    print(f"Импорт подделанной цепи: {is_valid}, ошибки: {errors}")
+    assert not is_valid
+    assert tampered.get_chain_length() == 3
+
+    # Подделка до структурной ошибки в том же пакете тоже должна пройти проверку хеша
+    buffer.seek(0)
+    blocks = list(read_ndjson_blocks(buffer))
+    blocks[2].transactions[0].amount = 999.0
+    blocks[4].previous_hash = "0" * 64
+    mixed = Blockchain(difficulty=1)
+    is_valid, errors = mixed.bulk_import(blocks)
+    print(f"Импорт с подделкой и разрывом связи: {is_valid}, ошибки: {errors}")
+    assert not is_valid
+    assert mixed.get_chain_length() == 2
+    print()
+
+
+def test_bulk_import_resume():
+    print("=== ТЕСТ 4: Возобновление импорта с контрольной точки ===")
+    import os
+    import tempfile
+
+    source = build_blockchain(blocks=6)
+    blocks = list(source.iter_blocks())
+
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoint_path = os.path.join(directory, "import.checkpoint")
+
+        first = Blockchain(difficulty=1)
+        first.create_wallet("Alice", 100.0)
+        first.create_wallet("Bob", 100.0)
+        first.bulk_import(blocks[:4], batch_size=2, checkpoint_path=checkpoint_path)
+
+        second = Blockchain(difficulty=1)
+        is_valid, errors = second.bulk_import(blocks, batch_size=2, checkpoint_path=checkpoint_path,
+                                              resume=True, workers=2)
+        print(f"Импорт после возобновления: {is_valid}, блоков: {second.get_chain_length()}")
+        assert is_valid, errors
+        assert second.get_latest_block().hash == source.get_latest_block().hash
+        assert abs(second.get_balance("Miner1") - source.get_balance("Miner1")) < 1e-9
+    print()
+
+
+def test_readonly_snapshot():
+    print("=== ТЕСТ 5: Снимок состояния для быстрых запросов ===")
+    import os
+    import subprocess
+    import sys
+    import tempfile
+    from readonly import ChainSnapshot
+
+    blockchain = build_blockchain()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "chain.snapshot")
+        blockchain.save_snapshot(path)
+
+        snapshot = ChainSnapshot(path)
+        print(f"Вершина: {snapshot.get_tip()['height']}, баланс Bob: {snapshot.get_balance('Bob')} BTC")
+        assert snapshot.get_tip()['hash'] == blockchain.get_latest_block().hash
+        assert snapshot.get_balance("Bob") == blockchain.get_balance("Bob")
+        assert snapshot.get_balance("Nobody") == 0.0
+
+        result = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, readonly; readonly.main([sys.argv[1], 'balance', 'Bob']); "
+             "print('blockchain' in sys.modules)", path],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        print(result.stdout.strip())
+        assert result.stdout.strip().endswith("False")
+    print()
+
+
+def test_pruning():
+    print("=== ТЕСТ 6: Обрезка цепи и архив тел блоков ===")
+    import os
+    import tempfile
+    from readonly import ChainSnapshot
+
+    reference = build_blockchain(blocks=6)
+
+    with tempfile.TemporaryDirectory() as directory:
+        blockchain = Blockchain(difficulty=1, clock=CounterClock(1000.0), id_factory=CounterIdFactory(),
+                                prune_depth=2, archive_dir=directory)
+        blockchain.prune_batch = 0
+        blockchain.create_wallet("Alice", 100.0)
+        blockchain.create_wallet("Bob", 100.0)
+        for i in range(6):
+            blockchain.transfer("Alice", "Bob", float(i + 1), fee=0.1)
+            blockchain.transfer("Bob", "Alice", 0.5, fee=0.2)
+            blockchain.mine_pending_transactions("Miner1")
+
+        pruned = [block.index for block in blockchain.chain if block.is_pruned]
+        print(f"Блоки в архиве: {pruned}, высота обрезки: {blockchain.pruned_height}")
+        assert pruned == list(range(blockchain.pruned_height + 1))
+        assert blockchain.pruned_height >= 3
+        assert not blockchain.chain[-1].is_pruned
+
+        history = blockchain.get_wallet_history("Alice", limit=100)
+        expected = reference.get_wallet_history("Alice", limit=100)
+        assert [entry['transaction'].transaction_id for entry in history] == \
+            [entry['transaction'].transaction_id for entry in expected]
+        print(f"История Alice из архива: {len(history)} транзакций")
+
+        is_valid, errors = blockchain.is_chain_valid()
+        print(f"Цепь после обрезки валидна: {is_valid}")
+        assert is_valid, errors
+
+        snapshot = ChainSnapshot(os.path.join(directory, "state.snapshot"))
+        assert snapshot.get_balance("Miner1") == blockchain.get_balance("Miner1")
+
+        # Позиции архивных транзакций ищутся в хранилище тел, в памяти - только необрезанный хвост
+        archived = reference.chain[1].transactions[0]
+        kept = sum(len(block.transactions) for block in blockchain.chain[blockchain.pruned_height + 1:])
+        print(f"Транзакций в индексе в памяти: {len(blockchain.transaction_index)}")
+        assert len(blockchain.transaction_index) == kept
+        assert blockchain.body_store.locate(archived.transaction_id) == (1, 0)
+        blockchain.seen_transactions.recent.clear()
+        assert not blockchain.add_transaction(archived)
+
+        blockchain.chain[1].previous_hash = "0" * 64
+        assert not blockchain.is_chain_valid()[0]
+        blockchain.chain[1].previous_hash = blockchain.chain[0].hash
+
+        blockchain.chain[-1].transactions[0].amount = 999.0
+        is_valid, errors = blockchain.is_chain_valid()
+        print(f"Подделка в оставшейся части обнаружена: {not is_valid}")
+        assert not is_valid
+        blockchain.body_store.close()
+    print()
+
+
+def test_block_archive():
+    print("=== ТЕСТ 7: Сжатый архив блоков с произвольным доступом ===")
+    import os
+    import tempfile
+    from archive import ArchiveReader
+
+    blockchain = build_blockchain(blocks=7)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for codec in ('zlib', 'lzma'):
+            path = os.path.join(directory, f"chain.{codec}.archive")
+            written = blockchain.export_archive(path, chunk_size=3, codec=codec)
+            assert written == blockchain.get_chain_length()
+
+            with ArchiveReader(path) as reader:
+                print(f"{codec}: {len(reader)} блоков в {len(reader.chunks)} чанках, {os.path.getsize(path)} байт")
+                assert len(reader) == blockchain.get_chain_length()
+
+                block = reader.get_block(5)
+                original = blockchain.chain[5]
+                assert reader.chunks_decoded == 1
+                assert block.to_dict() == original.to_dict()
+
+                blocks = list(reader.iter_blocks(2, 7))
+                assert [b.hash for b in blocks] == [b.hash for b in blockchain.chain[2:7]]
+
+                is_valid, errors = blockchain.validate_blocks(reader.iter_blocks())
+                print(f"  Цепь из архива валидна: {is_valid}")
+                assert is_valid, errors
+
+                try:
+                    reader.get_block(100)
+                    assert False, "Блок вне архива должен вызывать KeyError"
+                except KeyError:
+                    pass
+
+        # Разорванная связь внутри чанка сохраняется как есть и видна валидации
+        broken = build_blockchain(blocks=5)
+        broken.chain[4].previous_hash = "0" * 64
+        path = os.path.join(directory, "broken.archive")
+        broken.export_archive(path, chunk_size=3)
+        with ArchiveReader(path) as reader:
+            assert reader.get_block(4).previous_hash == "0" * 64
+            assert reader.get_block(5).previous_hash == broken.chain[4].hash
+            is_valid, errors = broken.validate_blocks(reader.iter_blocks())
+        print(f"  Ошибки архива с разорванной связью: {errors}")
+        assert errors == broken.is_chain_valid()[1]
+    print()
+
+
+def run_all_storage_tests():
+    """Запуск всех тестов хранения"""
+    print("🧪 ТЕСТИРОВАНИЕ ХРАНЕНИЯ ЦЕПИ 🧪\n")
+
+    test_streaming_iterators()
+    test_ndjson_roundtrip()
+    test_bulk_import()
+    test_bulk_import_resume()
+    test_readonly_snapshot()
+    test_pruning()
+    test_block_archive()
+
+    print("🎉 ТЕСТЫ ХРАНЕНИЯ ЗАВЕРШЕНЫ! 🎉")
+
+
+if __name__ == "__main__":
+    run_all_storage_tests()
@@ -1,6 +1,6 @@
 # test_transactions.py
 import time
-from blockchain import Transaction, Blockchain
+from blockchain import Transaction, Blockchain, CounterClock, CounterIdFactory
 
 
 def test_transaction_creation():
@@ -119,6 +119,92 @@ def test_transaction_in_block():
     print(f"Все транзакции в блоке валидны: {latest_block.has_valid_transactions()}")
 
 
+def test_deterministic_simulation():
+    print("=== ТЕСТ 6: Детерминированные часы и идентификаторы ===")
+
+    def run_simulation():
+        blockchain = Blockchain(difficulty=2, clock=CounterClock(1000.0), id_factory=CounterIdFactory())
+        blockchain.create_wallet("Alice", 100.0)
+        blockchain.create_wallet("Bob", 0.0)
+        blockchain.transfer("Alice", "Bob", 25.0, fee=0.5)
+        blockchain.mine_pending_transactions("Miner1")
+        return blockchain
+
+    first = run_simulation()
+    second = run_simulation()
+
+    print(f"ID первой транзакции: {first.chain[1].transactions[0].transaction_id}")
+    print(f"Хеши блоков совпадают: {first.get_latest_block().hash == second.get_latest_block().hash}")
+    print(f"Nonce совпадают: {first.get_latest_block().nonce == second.get_latest_block().nonce}")
+    assert [b.hash for b in first.chain] == [b.hash for b in second.chain]
+    assert first.chain[1].transactions[0].transaction_id == "tx-1"
+    print()
+
+
+def test_wallet_history():
+    print("=== ТЕСТ 7: История переводов кошелька ===")
+
+    blockchain = Blockchain(difficulty=1)
+    blockchain.create_wallet("Alice", 100.0)
+    blockchain.create_wallet("Bob", 100.0)
+
+    for i in range(5):
+        blockchain.transfer("Alice", "Bob", float(i + 1), fee=0.1)
+        blockchain.mine_pending_transactions("Miner1")
+    blockchain.transfer("Bob", "Alice", 7.0, fee=0.1)
+
+    history = blockchain.get_wallet_history("Alice", limit=3)
+    for entry in history:
+        print(f"  Блок #{entry['height']}: {entry['transaction']}")
+    assert [entry['transaction'].amount for entry in history] == [5.0, 4.0, 3.0]
+
+    page = blockchain.get_wallet_history("Alice", limit=2, offset=3)
+    assert [entry['transaction'].amount for entry in page] == [2.0, 1.0]
+
+    with_pending = blockchain.get_wallet_history("Alice", limit=2, include_pending=True)
+    print(f"С ожидающими: {[entry['confirmed'] for entry in with_pending]}")
+    assert with_pending[0]['confirmed'] is False
+    assert with_pending[0]['transaction'].amount == 7.0
+    assert with_pending[1]['transaction'].amount == 5.0
+
+    index_before = blockchain.address_index
+    blockchain.rebuild_address_index()
+    assert blockchain.address_index == index_before
+    print()
+
+
+def test_wallet_registry():
+    print("=== ТЕСТ 8: Реестр кошельков с шардированием ===")
+    from concurrent.futures import ThreadPoolExecutor
+
+    blockchain = Blockchain(difficulty=1, wallet_shards=4)
+    created = blockchain.create_wallets((f"user_{i}" for i in range(1000)), 10.0)
+    print(f"Создано кошельков: {created}, шардов: {blockchain.wallets.num_shards}")
+    assert created == 1000
+    assert blockchain.create_wallets(["user_1", "new_user"], 5.0) == 1
+
+    registry = blockchain.wallets
+    wallet_id = registry.id_of("user_42")
+    assert registry.name_of(wallet_id) == "user_42"
+    assert registry.balance_by_id(wallet_id) == 10.0
+
+    ids = [registry.id_of(f"user_{i % 500}") for i in range(2000)]
+    deltas = [0.1 * (i % 7) - 0.2 for i in range(2000)]
+    expected = {name: registry[name] for name in registry}
+    for wallet_id, delta in zip(ids, deltas):
+        name = registry.name_of(wallet_id)
+        expected[name] = expected[name] + delta
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        registry.apply_deltas(ids, deltas, executor=executor)
+    print(f"Баланс user_3 после пакетного обновления: {registry['user_3']}")
+    assert dict(registry) == expected
+
+    assert blockchain.transfer("user_1", "user_2", 5.0, fee=0.1)
+    assert not blockchain.transfer("user_1", "missing", 1.0)
+    print()
+
+
 def run_all_transaction_tests():
     """Запуск всех тестов транзакций"""
     print("🧪 ТЕСТИРОВАНИЕ СИСТЕМЫ ТРАНЗАКЦИЙ 🧪\n")
@@ -128,6 +214,9 @@ def run_all_transaction_tests():
     test_blockchain_with_transactions()
     test_insufficient_funds()
     test_transaction_in_block()
+    test_deterministic_simulation()
+    test_wallet_history()
+    test_wallet_registry()
 
     print("🎉 ТЕСТЫ ТРАНЗАКЦИЙ ЗАВЕРШЕНЫ! 🎉")
 
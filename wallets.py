@@ -0,0 +1,150 @@
+# wallets.py
+from array import array
+from collections.abc import MutableMapping
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+
+
+def _numpy():
+    # NumPy нужен только для крупных пакетов изменений - не грузим его при импорте блокчейна
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class WalletRegistry(MutableMapping):
+    def __init__(self, num_shards: int = 1):
+        if num_shards < 1:
+            raise ValueError("Количество шардов должно быть положительным")
+        self.num_shards = num_shards
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        # Кошелек с id попадает в шард id % num_shards на позицию id // num_shards
+        self.shards: List[array] = [array('d') for _ in range(num_shards)]
+
+    def __getitem__(self, name: str) -> float:
+        wallet_id = self.ids[name]
+        return self.shards[wallet_id % self.num_shards][wallet_id // self.num_shards]
+
+    def __setitem__(self, name: str, balance: float):
+        wallet_id = self.ids.get(name)
+        if wallet_id is None:
+            self.register(name, balance)
+        else:
+            self.shards[wallet_id % self.num_shards][wallet_id // self.num_shards] = balance
+
+    def __delitem__(self, name: str):
+        raise TypeError("Удаление кошельков не поддерживается")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self.ids
+
+    def get(self, name: str, default: float = None) -> Optional[float]:
+        wallet_id = self.ids.get(name)
+        if wallet_id is None:
+            return default
+        return self.shards[wallet_id % self.num_shards][wallet_id // self.num_shards]
+
+    def id_of(self, name: str) -> Optional[int]:
+        return self.ids.get(name)
+
+    def name_of(self, wallet_id: int) -> str:
+        return self.names[wallet_id]
+
+    def register(self, name: str, balance: float = 0.0) -> int:
+        wallet_id = len(self.names)
+        self.ids[name] = wallet_id
+        self.names.append(name)
+        self.shards[wallet_id % self.num_shards].append(balance)
+        return wallet_id
+
+    def register_many(self, names: Iterable[str], balance: float = 0.0) -> List[int]:
+        created = []
+        for name in names:
+            if name not in self.ids:
+                created.append(self.register(name, balance))
+        return created
+
+    def balance_by_id(self, wallet_id: int) -> float:
+        return self.shards[wallet_id % self.num_shards][wallet_id // self.num_shards]
+
+    def set_balance_by_id(self, wallet_id: int, balance: float):
+        self.shards[wallet_id % self.num_shards][wallet_id // self.num_shards] = balance
+
+    def shard_ids(self, shard: int) -> range:
+        return range(shard, len(self.names), self.num_shards)
+
+    def partition_by_shard(self, wallet_ids: Iterable[int],
+                           deltas: Iterable[float]) -> Dict[int, Tuple[List[int], List[float]]]:
+        partitions: Dict[int, Tuple[List[int], List[float]]] = {}
+        for wallet_id, delta in zip(wallet_ids, deltas):
+            offsets, amounts = partitions.setdefault(wallet_id % self.num_shards, ([], []))
+            offsets.append(wallet_id // self.num_shards)
+            amounts.append(delta)
+        return partitions
+
+    def apply_shard_deltas(self, shard: int, offsets: List[int], deltas: List[float]):
+        # Изменения по одному кошельку применяются в исходном порядке - результат как при поочередном сложении
+        balances = self.shards[shard]
+        np = _numpy() if len(offsets) > 64 else None
+        if np is not None:
+            view = np.frombuffer(balances, dtype=np.float64)
+            np.add.at(view, np.asarray(offsets, dtype=np.int64), np.asarray(deltas, dtype=np.float64))
+            del view
+        else:
+            for offset, delta in zip(offsets, deltas):
+                balances[offset] += delta
+
+    def apply_unique_deltas(self, wallet_ids: List[int], deltas: List[float], executor=None):
+        # Каждый id встречается один раз - можно складывать векторно без np.add.at
+        np = _numpy()
+        if np is None:
+            self.apply_deltas(wallet_ids, deltas, executor)
+            return
+
+        ids = np.asarray(wallet_ids, dtype=np.int64)
+        values = np.asarray(deltas, dtype=np.float64)
+        if self.num_shards == 1:
+            self._add_to_shard(0, ids, values)
+            return
+
+        shard_of = ids % self.num_shards
+        offsets = ids // self.num_shards
+        jobs = []
+        for shard in range(self.num_shards):
+            mask = shard_of == shard
+            if mask.any():
+                jobs.append((shard, offsets[mask], values[mask]))
+
+        if executor is None or len(jobs) < 2:
+            for job in jobs:
+                self._add_to_shard(*job)
+        else:
+            for future in [executor.submit(self._add_to_shard, *job) for job in jobs]:
+                future.result()
+
+    def _add_to_shard(self, shard: int, offsets, values):
+        import numpy as np
+        view = np.frombuffer(self.shards[shard], dtype=np.float64)
+        view[offsets] += values
+        del view
+
+    def apply_deltas(self, wallet_ids: Iterable[int], deltas: Iterable[float], executor=None):
+        partitions = self.partition_by_shard(wallet_ids, deltas)
+        if executor is None or len(partitions) < 2:
+            for shard, (offsets, amounts) in partitions.items():
+                self.apply_shard_deltas(shard, offsets, amounts)
+            return
+
+        # Шарды не пересекаются по памяти, поэтому их можно обновлять одновременно
+        futures = [executor.submit(self.apply_shard_deltas, shard, offsets, amounts)
+                   for shard, (offsets, amounts) in partitions.items()]
+        for future in futures:
+            future.result()